@@ -3,6 +3,8 @@ remote_ip="10.14.43.94"   #ip-address of FSO VM
 
 iso_plugin_path="/Users/prabhat.ranjan/Desktop/Projects/iso-plugins/" #iso-plugins project path
 plugin_tar_path="/Users/prabhat.ranjan/Desktop/Projects/plugins_tar" #folder store tar package of plugin
+readme_format="text" #create_readme output format: text, markdown or json
+wheel_cache_mb=2048 #size limit of the dependency wheel cache on FSO VM used by generate_tar
 
 ##     -----****----set colour of echo----****----
 # Reset
@@ -0,0 +1,65 @@
+##     -----****----shared ssh session to FSO VM----****----
+# every ssh/rsync of the toolkit goes through one multiplexed master connection per (user, remote_ip),
+# the master stays up for ssh_idle_timeout after its last command so the next command skips the handshake
+
+# fso_hosts runs the scripts against a named host of config/hosts and gives every host its own plugin_tar_path,
+# outside of fso_hosts both variables are unset and config/config.sh applies as is
+if [ "$fso_host_ip" != "" ]; then
+  remote_ip=$fso_host_ip
+  plugin_tar_path=$fso_host_plugin_tar_path
+fi
+
+# python bundled with FSO on the FSO Machine, remote python code runs with it instead of the system python3
+fso_python=/opt/fireeye/fso/apps/engine/python/bin/python3
+
+ssh_control_dir=${ssh_control_dir:-$HOME/.ssh/iso_plugins_automation}
+ssh_idle_timeout=${ssh_idle_timeout:-15m}
+
+# %C is a hash of local host, remote host, port and user, so each (user, remote_ip) gets its own master
+ssh_options="-o ControlMaster=auto -o ControlPath=$ssh_control_dir/%C -o ControlPersist=$ssh_idle_timeout -o ServerAliveInterval=15 -o ServerAliveCountMax=3"
+
+# health check of the master for user $1, a stale control socket is removed and a new master is opened
+remote_session() {
+  if ssh $ssh_options -O check $1@$remote_ip 2>/dev/null; then
+    return 0
+  fi
+  mkdir -p $ssh_control_dir
+  chmod 700 $ssh_control_dir
+  control_socket=$(ssh $ssh_options -G $1@$remote_ip 2>/dev/null | awk '$1 == "controlpath" {print $2}')
+  if [ "$control_socket" != "" ] && [ -e "$control_socket" ]; then
+    # a concurrent command may have opened its master since the check above, the socket is checked again and
+    # only removed when nothing listens on it any more
+    check_error=$(ssh $ssh_options -O check $1@$remote_ip 2>&1) && return 0
+    case $check_error in
+      *"connect($control_socket): Connection refused"*) rm -f "$control_socket";;
+    esac
+  fi
+  ssh $ssh_options -o ConnectTimeout=10 -fN $1@$remote_ip
+}
+
+remote_session_close() {
+  ssh $ssh_options -O exit $1@$remote_ip 2>/dev/null
+}
+
+# remote_ssh <user> <command>, stdin is passed on to the remote command
+remote_ssh() {
+  remote_user=$1
+  shift
+  remote_session $remote_user </dev/null >/dev/null 2>&1
+  ssh $ssh_options $remote_user@$remote_ip "$@"
+}
+
+# remote_python <user> <args>, the python source on stdin runs with $fso_python on the FSO Machine
+remote_python() {
+  remote_ssh $1 "$fso_python - $2"
+}
+
+# remote_rsync <user> <rsync args>, the user must match the user@remote_ip in the rsync paths
+remote_rsync() {
+  remote_user=$1
+  shift
+  remote_session $remote_user >/dev/null 2>&1
+  rsync -e "ssh $ssh_options" "$@"
+}
+
+# -----------------------------*****--------------------------------------
@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from create_readme import generate_readme
+from schema_cache import SchemaCache
+from readme_renderers import RENDERERS
+
+
+def find_plugin_tars(plugin_tar_path):
+    # same pick as create_readme.sh: first non-sr tar of every <plugin_tar_path>/<plugin> dir
+    plugin_tars = []
+    for plugin_name in sorted(os.listdir(plugin_tar_path)):
+        plugin_dir = os.path.join(plugin_tar_path, plugin_name)
+        if not os.path.isdir(plugin_dir):
+            continue
+        tar_files = [f for f in sorted(os.listdir(plugin_dir)) if '_sr' not in f and f.endswith(('.tar.gz', '.tgz'))]
+        if tar_files:
+            plugin_tars.append((plugin_name, os.path.join(plugin_dir, tar_files[0])))
+    return plugin_tars
+
+
+def generate_plugin_readme(plugin_name, plugin_tar_file, output_dir, cache_dir, readme_format, schema_cache_mb):
+    start = time.perf_counter()
+    try:
+        os.makedirs(os.path.join(output_dir, plugin_name), exist_ok=True)
+        status = generate_readme(plugin_tar_file,
+                                 os.path.join(output_dir, plugin_name, RENDERERS[readme_format].file_name),
+                                 plugin_name, cache_dir, readme_format,
+                                 SchemaCache(os.path.join(cache_dir, "schemas"), schema_cache_mb * 1024 * 1024)
+                                 if cache_dir else None)
+        error = None
+    except Exception as e:
+        status = "failed"
+        error = "%s: %s" % (type(e).__name__, e)
+    return plugin_name, status, time.perf_counter() - start, error
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="create README.md of every plugin in plugin_tar_path")
+    parser.add_argument("plugin_tar_path")
+    parser.add_argument("output_dir", help="README of each plugin is written to <output_dir>/<plugin>/")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--cache-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--format", dest="readme_format", choices=sorted(RENDERERS), default="text")
+    parser.add_argument("--schema-cache-mb", type=int, default=64)
+    args = parser.parse_args()
+
+    plugin_tars = find_plugin_tars(args.plugin_tar_path)
+    cache_dir = None if args.no_cache else args.cache_dir
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(generate_plugin_readme, plugin_name, plugin_tar_file, args.output_dir, cache_dir,
+                                   args.readme_format, args.schema_cache_mb)
+                   for plugin_name, plugin_tar_file in plugin_tars]
+        for future in futures:
+            results.append(future.result())
+    total = time.perf_counter() - start
+
+    print("%-40s %-10s %10s" % ("plugin", "status", "time(s)"))
+    for plugin_name, status, elapsed, error in sorted(results, key=lambda result: -result[2]):
+        print("%-40s %-10s %10.3f" % (plugin_name, status, elapsed))
+    failures = [result for result in results if result[1] == "failed"]
+    for plugin_name, status, elapsed, error in failures:
+        print("failed %s - %s" % (plugin_name, error))
+    print("\n%d plugins, %d rendered, %d cached, %d failed in %.2fs with %d jobs" % (
+        len(results), sum(1 for result in results if result[1] == "rendered"),
+        sum(1 for result in results if result[1] == "cached"), len(failures), total, args.jobs))
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,69 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from create_readme import CreateREADME, PackageFile, TypeRenderer, schema_events
+from readme_renderers import TextRenderer
+from schema_stream import STREAM_SIZE
+from synthetic_plugin import make_plugin_json, make_type_list_json
+
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def elapsed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def render_schema(kind, inputFile, stream_size):
+    # the path create_readme takes without a schema cache: schema_events straight into the renderer
+    package_file = PackageFile(os.path.basename(inputFile), path=inputFile)
+    create_readme = CreateREADME(None, None, "synthetic", TextRenderer())
+    outputf = io.StringIO()
+    if kind == "plugin":
+        create_readme.write_plugin_events(outputf, schema_events(package_file, kind, stream_size=stream_size))
+    else:
+        type_renderer = TypeRenderer(create_readme)
+        type_renderer.add_type_file(inputFile, schema_events(package_file, kind, stream_size=stream_size))
+        type_renderer.write_types(outputf)
+    return outputf.tell()
+
+
+if __name__ == "__main__":
+    workDir = tempfile.mkdtemp(prefix="readme_memory_")
+    try:
+        print("rendered through schema_events, json.load below %d MB and streamed above it by default"
+              % (STREAM_SIZE // 2 ** 20))
+        print("%-8s %8s %9s %14s %11s %12s %10s" % ("schema", "size", "file(MB)", "json.load(MB)", "stream(MB)",
+                                                   "json.load(s)", "stream(s)"))
+        cases = [("plugin", command_count, "synthetic.json", make_plugin_json(command_count))
+                 for command_count in (100, 1000, 10000)]
+        # the file is named after its first type, like a top-level type of a package
+        cases += [("types", type_count, "synthetic.Type0.json", make_type_list_json(type_count))
+                  for type_count in (100, 1000, 10000)]
+        for kind, size, name, document in cases:
+            inputFile = os.path.join(workDir, "%s_%d" % (kind, size), name)
+            os.makedirs(os.path.dirname(inputFile))
+            with open(inputFile, "w") as outputf:
+                json.dump(document, outputf, indent=2)
+            del document
+            # stream_size 0 forces the stream parser, a size no file reaches forces json.load
+            loaded = peak_memory(render_schema, kind, inputFile, float("inf"))
+            streamed = peak_memory(render_schema, kind, inputFile, 0)
+            print("%-8s %8d %9.2f %14.2f %11.2f %12.3f %10.3f" % (
+                kind, size, os.path.getsize(inputFile) / 2 ** 20, loaded / 2 ** 20, streamed / 2 ** 20,
+                elapsed(render_schema, kind, inputFile, float("inf")), elapsed(render_schema, kind, inputFile, 0)))
+    finally:
+        shutil.rmtree(workDir)
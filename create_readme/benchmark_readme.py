@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from create_readme import iter_package_json, render_package
+from synthetic_plugin import make_plugin_json
+from toolkit.state import write_atomic
+
+
+class LegacyREADME:
+    # frozen copy of the write path before the buffered renderer: padding built one space at a time and
+    # the README opened once in append mode per top-level plugin JSON, lines written straight to the file,
+    # so the benchmark keeps measuring against it whatever createReadMe does now
+    def __init__(self, inputFile, outputFile, pluginFileName):
+        self.inputFile = inputFile
+        self.space_for_desc = 50
+        self.extra_space_for_desc = 75
+        self.outputFile = outputFile
+        self.pluginFileName = pluginFileName
+
+    def get_spaces(self, line):
+        spaces = ""
+        if line:
+            spaces_req = self.space_for_desc - len(line)
+        else:
+            spaces_req = self.space_for_desc
+        if spaces_req > 0:
+            while spaces_req:
+                spaces += " "
+                spaces_req -= 1
+        else:
+            spaces_req = self.extra_space_for_desc - len(line)
+            while spaces_req > 0 and spaces_req:
+                spaces += " "
+                spaces_req -= 1
+        return spaces
+
+    def create_output_line(self, param_json):
+        line = "\t" + param_json.get('name') + "(" + param_json.get('type') + ")"
+        spaces = self.get_spaces(line)
+        return line + spaces + "- " + param_json.get('properties').get('description') + "\n"
+
+    def write_plugin_parameters(self, outputf, parameters):
+        outputf.write("Plugin Parameters :\n\n")
+        if parameters:
+            for parameter in parameters:
+                if isinstance(parameter, list):
+                    outputf.write(self.create_output_line(parameter[1]))
+
+    def create_command_parameter_line(self, param_json):
+        line = "\t\t\t" + param_json.get('name') + "(" + param_json.get('type').replace(self.pluginFileName + ".",
+                                                                                        "") + ")"
+        spaces = self.get_spaces(line)
+        return line + spaces + "- " + param_json.get('properties').get('description') + "\n"
+
+    def write_parameters(self, outputf, parameters, parameter_type):
+        outputf.write("\t\t" + parameter_type + " -\n")
+        if parameters:
+            for parameter in parameters:
+                if isinstance(parameter, list):
+                    outputf.write(self.create_command_parameter_line(parameter[1]))
+                elif isinstance(parameter, dict):
+                    outputf.write(self.create_command_parameter_line(parameter))
+
+    def write_plugin_commands(self, outputf, base_commands):
+        outputf.write("Commands :\n")
+        if base_commands:
+            command_no = 0
+            for base_command in base_commands:
+                command_no += 1
+                if isinstance(base_command, dict):
+                    outputf.write("\n\t" + str(command_no) + ". " + base_command.get('name') + "\n")
+                    outputf.write("\t\t" + base_command.get('description') + "\n")
+                    self.write_parameters(outputf, base_command.get('input_parameters'), "input")
+                    self.write_parameters(outputf, base_command.get('output_parameters'), "output")
+
+    def createReadMe(self):
+        with open(self.inputFile, 'r') as inputf:
+            file_data = json.load(inputf)
+            outputf = open(self.outputFile, "a")
+            self.write_plugin_parameters(outputf, file_data.get('parameters'))
+            outputf.write("\n")
+            self.write_plugin_commands(outputf, file_data.get('base_commands'))
+            outputf.close()
+
+
+def make_package(workDir, command_count, plugin_count):
+    packageDir = os.path.join(workDir, "synthetic.plugin.1.0.0")
+    os.makedirs(packageDir)
+    for p in range(plugin_count):
+        with open(os.path.join(packageDir, f"plugin{p}.json"), "w") as outputf:
+            json.dump(make_plugin_json(command_count), outputf, indent=2)
+    return packageDir
+
+
+def run_legacy(packageDir, outputFile):
+    if os.path.exists(outputFile):
+        os.remove(outputFile)
+    for f in os.listdir(packageDir):
+        if f.endswith('.json') and f != "index.json" and len(f.split('.')) <= 2:
+            LegacyREADME(os.path.join(packageDir, f), outputFile, "plugin").createReadMe()
+
+
+def run_buffered(packageDir, outputFile):
+    content, sections = render_package(list(iter_package_json(packageDir)), "plugin")
+    write_atomic(outputFile, content)
+
+
+def best_of(func, repeat, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print("%8s %8s %12s %12s %8s" % ("commands", "plugins", "legacy(s)", "buffered(s)", "speedup"))
+    for command_count, plugin_count in [(10, 1), (100, 1), (1000, 1), (1000, 8), (5000, 4)]:
+        workDir = tempfile.mkdtemp(prefix="readme_bench_")
+        try:
+            packageDir = make_package(workDir, command_count, plugin_count)
+            legacy_output = os.path.join(workDir, "legacy.md")
+            buffered_output = os.path.join(workDir, "buffered.md")
+            legacy = best_of(run_legacy, repeat, packageDir, legacy_output)
+            buffered = best_of(run_buffered, repeat, packageDir, buffered_output)
+            # the renderer pads each table to its own column width, only the words have to match
+            with open(legacy_output) as legacyf, open(buffered_output) as bufferedf:
+                if (sorted(" ".join(section.split()) for section in legacyf.read().split("Plugin Parameters :")) !=
+                        sorted(" ".join(section.split()) for section in bufferedf.read().split("Plugin Parameters :"))):
+                    print("output mismatch for %d commands, %d plugins" % (command_count, plugin_count))
+            print("%8d %8d %12.4f %12.4f %7.2fx" % (command_count, plugin_count, legacy, buffered, legacy / buffered))
+        finally:
+            shutil.rmtree(workDir)
@@ -0,0 +1,165 @@
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from create_readme import CreateREADME, TypeRenderer, generate_readme, iter_package_json, schema_events
+from readme_renderers import RENDERERS
+from schema_cache import SchemaCache
+from synthetic_plugin import make_package_files, write_package_tar
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_results")
+
+# (name, commands, type files, type depth, type fanout)
+CASES = [
+    ("commands_10", 10, 1, 2, 2),
+    ("commands_100", 100, 2, 3, 2),
+    ("commands_1000", 1000, 2, 3, 2),
+    ("commands_10000", 10000, 2, 3, 2),
+    ("deep_types", 10, 4, 8, 2),
+    ("wide_types", 10, 4, 4, 5),
+]
+QUICK_CASES = ["commands_10", "commands_100", "deep_types"]
+
+
+def timed(func, repeat, close=None):
+    # close(result) is called for the result of every run but the last one, which is returned
+    best = None
+    result = None
+    for run in range(repeat):
+        if run and close:
+            close(result)
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def extract(tar_file):
+    package_files = list(iter_package_json(tar_file))
+    for package_file in package_files:
+        package_file.digest()
+    return package_files
+
+
+def close_all(package_files):
+    for package_file in package_files:
+        package_file.close()
+
+
+def parse(package_files):
+    events = {}
+    for package_file in package_files:
+        if package_file.name != "index.json":
+            # kept as lists, every repeat of render() takes the same events
+            events[package_file.name] = list(schema_events(
+                package_file, "types" if len(package_file.name.split('.')) > 2 else "plugin"))
+    return events
+
+
+def render(events, readme_format):
+    renderer = RENDERERS[readme_format]()
+    sections = []
+    type_renderer = TypeRenderer(CreateREADME(None, None, "synthetic", renderer))
+    for name in sorted(events):
+        if len(name.split('.')) <= 2:
+            sectionf = io.StringIO()
+            CreateREADME(name, None, "synthetic", renderer).write_plugin_events(sectionf, events[name])
+            sections.append(sectionf.getvalue())
+        else:
+            type_renderer.add_type_file(name, events[name])
+    sectionf = io.StringIO()
+    type_renderer.write_types(sectionf)
+    sections.append(sectionf.getvalue())
+    return renderer.join(sections)
+
+
+def run_case(work_dir, name, command_count, type_count, type_depth, type_fanout, repeat):
+    tar_file = write_package_tar(os.path.join(work_dir, name + ".tar.gz"),
+                                 make_package_files(command_count, type_count, type_depth, type_fanout))
+    result = {"commands": command_count, "type_files": type_count, "type_depth": type_depth,
+              "type_fanout": type_fanout, "tar_bytes": os.path.getsize(tar_file)}
+    result["extract_s"], package_files = timed(lambda: extract(tar_file), repeat, close_all)
+    result["parse_s"], events = timed(lambda: parse(package_files), repeat)
+    for readme_format in sorted(RENDERERS):
+        result["render_%s_s" % readme_format], content = timed(lambda: render(events, readme_format), repeat)
+        result["output_%s_bytes" % readme_format] = len(content)
+    close_all(package_files)
+
+    cache_dir = os.path.join(work_dir, name + "_cache")
+    output_file = os.path.join(work_dir, name + ".md")
+
+    def cold():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        return generate_readme(tar_file, output_file, "synthetic", cache_dir, "text",
+                               SchemaCache(os.path.join(cache_dir, "schemas")))
+
+    result["end_to_end_cold_s"], status = timed(cold, repeat)
+    result["end_to_end_cached_s"], status = timed(
+        lambda: generate_readme(tar_file, output_file, "synthetic", cache_dir, "text",
+                                SchemaCache(os.path.join(cache_dir, "schemas"))), repeat)
+    return result
+
+
+def compare(results, baseline, threshold):
+    # every *_s timing that got slower than baseline by more than threshold is a regression
+    regressions = []
+    for name, result in results["cases"].items():
+        baseline_result = baseline.get("cases", {}).get(name, {})
+        for key, value in result.items():
+            if key.endswith("_s") and baseline_result.get(key):
+                ratio = value / baseline_result[key]
+                if ratio > 1 + threshold:
+                    regressions.append((name, key, baseline_result[key], value, ratio))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="time extraction, parsing and rendering of synthetic plugins")
+    parser.add_argument("--cases", nargs="*", choices=[case[0] for case in CASES],
+                        help="cases to run, default all of them")
+    parser.add_argument("--quick", action="store_true", help="only run " + ", ".join(QUICK_CASES))
+    parser.add_argument("--repeat", type=int, default=3, help="best of <repeat> runs is reported")
+    parser.add_argument("--output", help="results JSON, default benchmark_results/<timestamp>.json")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slow down against the baseline")
+    args = parser.parse_args()
+
+    selected = args.cases or (QUICK_CASES if args.quick else [case[0] for case in CASES])
+    results = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+               "platform": platform.platform(), "repeat": args.repeat, "cases": {}}
+    work_dir = tempfile.mkdtemp(prefix="readme_suite_")
+    try:
+        print("%-16s %10s %10s %10s %10s %10s %10s %10s" % ("case", "tar(KB)", "extract", "parse", "text",
+                                                            "markdown", "cold", "cached"))
+        for name, command_count, type_count, type_depth, type_fanout in CASES:
+            if name not in selected:
+                continue
+            result = run_case(work_dir, name, command_count, type_count, type_depth, type_fanout, args.repeat)
+            results["cases"][name] = result
+            print("%-16s %10.1f %10.4f %10.4f %10.4f %10.4f %10.4f %10.4f" % (
+                name, result["tar_bytes"] / 1024, result["extract_s"], result["parse_s"], result["render_text_s"],
+                result["render_markdown_s"], result["end_to_end_cold_s"], result["end_to_end_cached_s"]))
+    finally:
+        shutil.rmtree(work_dir)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as outputf:
+        json.dump(results, outputf, indent=2)
+    print("results written to " + output)
+
+    if args.baseline:
+        with open(args.baseline) as baselinef:
+            regressions = compare(results, json.load(baselinef), args.threshold)
+        for name, key, before, after, ratio in regressions:
+            print("REGRESSION %s %s: %.4fs -> %.4fs (%.0f%% slower)" % (name, key, before, after, (ratio - 1) * 100))
+        if regressions:
+            sys.exit(1)
+        print("no regressions against " + args.baseline)
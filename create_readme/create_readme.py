@@ -1,115 +1,379 @@
+import argparse
+import contextlib
+import hashlib
+import io
 import json
+import shutil
 import sys
 import os
+import tarfile
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from readme_renderers import RENDERERS, TextRenderer  # noqa: E402
+from schema_cache import SchemaCache  # noqa: E402
+from schema_stream import STREAM_SIZE, iter_events  # noqa: E402
+from toolkit.state import write_atomic  # noqa: E402
+
+RENDER_VERSION = 3
+SPOOL_SIZE = 1024 * 1024
+
 
 class CreateREADME:
-    def __init__(self, inputFile, outputFile, pluginFileName):
+    def __init__(self, inputFile, outputFile, pluginFileName, renderer=None):
         self.inputFile = inputFile
-        self.space_for_desc = 50
-        self.extra_space_for_desc = 75
         self.outputFile = outputFile
         self.pluginFileName = pluginFileName
+        self.renderer = renderer or TextRenderer()
 
-    def get_spaces(self, line):
-        spaces = ""
-        if line:
-            spaces_req = self.space_for_desc - len(line)
-        else:
-            spaces_req = self.space_for_desc
-        if spaces_req > 0:
-            while spaces_req:
-                spaces += " "
-                spaces_req -= 1
-        else:
-            spaces_req = self.extra_space_for_desc - len(line)
-            while spaces_req > 0 and spaces_req:
-                spaces += " "
-                spaces_req -= 1
-
-        return spaces
+    def display_type(self, type_name):
+        return type_name.replace(self.pluginFileName + ".", "")
 
-    def create_output_line(self, param_json):
-        line = "\t" + param_json.get('name') + "(" + param_json.get('type') + ")"
-        spaces = self.get_spaces(line)
-        final_line = line + spaces + "- " + param_json.get('properties').get('description') + "\n"
-        return final_line
+    def parameter_row(self, param_json, depth=0):
+        properties = param_json.get('properties') or {}
+        return (depth, param_json.get('name'), self.display_type(param_json.get('type')),
+                properties.get('description') or "")
 
-    def write_plugin_parameters(self, outputf, parameters):
-        outputf.write("Plugin Parameters :\n\n")
+    def parameter_rows(self, parameters, parameter_type):
+        rows = []
         if parameters:
             for parameter in parameters:
                 if isinstance(parameter, list):
-                    param_json = parameter[1]
-                    output_line = self.create_output_line(param_json)
-                    outputf.write(output_line)
-                else:
-                    print("parameter format is unexpected, it should be list")
-
-    def create_command_parameter_line(self, param_json):
-        line = "\t\t\t" + param_json.get('name') + "(" + param_json.get('type').replace(self.pluginFileName + ".",
-                                                                                        "") + ")"
-        spaces = self.get_spaces(line)
-        final_line = line + spaces + "- " + param_json.get('properties').get('description') + "\n"
-        return final_line
-
-    def write_parameters(self, outputf, parameters, parameter_type):
-        outputf.write("\t\t" + parameter_type + " -\n")
-        if parameters:
-            for parameter in parameters:
-                if isinstance(parameter, list):
-                    param_json = parameter[1]
-                    output_line = self.create_command_parameter_line(param_json)
-                    outputf.write(output_line)
+                    rows.append(self.parameter_row(parameter[1]))
                 elif isinstance(parameter, dict):
-                    output_line = self.create_command_parameter_line(parameter)
-                    outputf.write(output_line)
+                    rows.append(self.parameter_row(parameter))
                 else:
-                    print("input parameter format is unexpected, it should be list or dict")
+                    print(parameter_type + " parameter format is unexpected, it should be list or dict")
+        return rows
 
-    def write_plugin_commands(self, outputf, base_commands):
-        outputf.write("Commands :\n")
+    def plugin_commands(self, base_commands):
+        commands = []
         if base_commands:
-            command_no = 0
             for base_command in base_commands:
-                command_no += 1
                 if isinstance(base_command, dict):
-                    outputf.write("\n\t" + str(command_no) + ". " + base_command.get('name') + "\n")
-                    outputf.write("\t\t" + base_command.get('description') + "\n")
-                    self.write_parameters(outputf, base_command.get('input_parameters'), "input")
-                    self.write_parameters(outputf, base_command.get('output_parameters'), "output")
+                    commands.append({
+                        "name": base_command.get('name'),
+                        "description": base_command.get('description') or "",
+                        "input": self.parameter_rows(base_command.get('input_parameters'), "input"),
+                        "output": self.parameter_rows(base_command.get('output_parameters'), "output"),
+                    })
                 else:
                     print("base_command format is unexpected, it should be dict")
-                    
+        return commands
+
+    def plugin_model(self, file_data):
+        return {
+            "name": file_data.get('name'),
+            "description": file_data.get('description') or "",
+            "parameters": self.parameter_rows(file_data.get('parameters'), "plugin"),
+            "commands": self.plugin_commands(file_data.get('base_commands')),
+        }
+
+    def plugin_model_from_events(self, events):
+        # same model as plugin_model, built from schema_stream events instead of the whole document
+        model = {"name": None, "description": "", "parameters": [], "commands": []}
+        for event, value in events:
+            if event == "parameter":
+                model["parameters"].extend(self.parameter_rows([value], "plugin"))
+            elif event == "command":
+                model["commands"].extend(self.plugin_commands([value]))
+            elif value:
+                model[event] = value
+        return model
+
+    def write_plugin(self, outputf, file_data):
+        outputf.write(self.renderer.render_plugin(self.plugin_model(file_data)))
+
+    def write_plugin_events(self, outputf, events):
+        outputf.write(self.renderer.render_plugin(self.plugin_model_from_events(events)))
+
     def createReadMe(self):
+        # legacy path: one README append per plugin JSON, kept for benchmark_readme.py
         with open(self.inputFile, 'r') as inputf:
             file_data = json.load(inputf)
-            base_commands = file_data.get('base_commands')
-            parameters = file_data.get('parameters')
-            outputf = open(self.outputFile, "a")
-            create_readme.write_plugin_parameters(outputf, parameters)
-            outputf.write("\n")
-            create_readme.write_plugin_commands(outputf, base_commands)
-            outputf.close()
+        with open(self.outputFile, "a") as outputf:
+            self.write_plugin(outputf, file_data)
 
 
-if __name__ == "__main__":
-    inputDir = sys.argv[1]
-    outputFile = sys.argv[2]
-    pluginFileName = sys.argv[3]
-    tar_files = os.listdir(inputDir)[0]
-    inputDir = os.path.join(inputDir, tar_files)
-
-    complexDataTypeJSON = []
-    for f in os.listdir(inputDir):
+class TypeRenderer:
+    # renders complexDataTypeJSON files, every ParameterType gets one section of its own fields and is referenced
+    # by name from the fields and sub-types using it, so a type shared by many fields is written once
+    def __init__(self, create_readme):
+        self.create_readme = create_readme
+        self.types = {}
+        self.top_level_types = []
+
+    def add_type_file(self, inputFile, type_list):
+        type_file_name = os.path.basename(inputFile)[:-len(".json")]
+        if isinstance(type_list, dict):
+            type_list = [type_list]
+        for parameter_type in type_list:
+            if isinstance(parameter_type, dict) and parameter_type.get('name'):
+                self.types[parameter_type.get('name')] = parameter_type
+                if parameter_type.get('name') == type_file_name:
+                    self.top_level_types.append(type_file_name)
+            else:
+                print("type format is unexpected, it should be dict with name")
+
+    def resolve_type_name(self, type_name):
+        if type_name and type_name.endswith(" List"):
+            type_name = type_name[:-len(" List")]
+        if type_name in self.types:
+            return type_name
+        return None
+
+    def type_fields(self, type_name):
+        params = []
+        for field in self.types[type_name].get('fields') or []:
+            if isinstance(field, list):
+                params.append(field[1])
+            elif isinstance(field, dict):
+                params.append(field)
+            else:
+                print("type field format is unexpected, it should be list or dict")
+        return params
+
+    def ordered_types(self):
+        # top-level types and every type they reach through a base or a field, each one once, a type is followed
+        # by the sub-types it introduces; an explicit stack so long chains of nested types need no recursion
+        ordered = []
+        seen = set()
+        stack = list(reversed(self.top_level_types))
+        while stack:
+            type_name = stack.pop()
+            if type_name in seen:
+                continue
+            seen.add(type_name)
+            ordered.append(type_name)
+            references = [self.resolve_type_name(self.types[type_name].get('base'))]
+            references += [self.resolve_type_name(param_json.get('type')) for param_json in self.type_fields(type_name)]
+            stack.extend(reference for reference in reversed(references) if reference and reference not in seen)
+        return ordered
+
+    def types_model(self):
+        models = []
+        for type_name in self.ordered_types():
+            base = self.resolve_type_name(self.types[type_name].get('base'))
+            models.append({
+                "name": self.create_readme.display_type(type_name),
+                "description": self.types[type_name].get('__description__') or "",
+                "base": self.create_readme.display_type(base) if base else None,
+                "fields": [self.create_readme.parameter_row(param_json) for param_json in self.type_fields(type_name)],
+            })
+        return models
+
+    def write_types(self, outputf):
+        outputf.write(self.create_readme.renderer.render_types(self.types_model()))
+
+
+def content_key(pluginFileName, readme_format, *digests):
+    digest = hashlib.sha256(("%d:%s:%s" % (RENDER_VERSION, pluginFileName, readme_format)).encode())
+    for content_digest in digests:
+        digest.update(content_digest)
+    return digest.hexdigest()
+
+
+def index_key(index_data, pluginFileName, readme_format):
+    # index.json hashes every plugin source and file, the JSONs are generated from those sources
+    index_fields = {key: index_data.get(key) for key in ("hash", "version", "package-api", "content")}
+    return content_key(pluginFileName, readme_format,
+                       hashlib.sha256(json.dumps(index_fields, sort_keys=True).encode()).digest())
+
+
+def cache_file_path(cache_dir, index_data, readme_format):
+    return os.path.join(cache_dir, "%s.%s.%s.json" % (index_data.get('vendor'), index_data.get('name'), readme_format))
+
+
+def load_cache(cache_file):
+    try:
+        with open(cache_file, 'r') as cachef:
+            return json.load(cachef)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_file, cache):
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    write_atomic(cache_file, json.dumps(cache))
+
+
+def render_section(sections, section_name, key, render):
+    section = sections.get(section_name)
+    if not section or section.get('key') != key:
+        outputf = io.StringIO()
+        render(outputf)
+        section = {"key": key, "text": outputf.getvalue()}
+    return section
+
+
+def schema_events(package_file, kind, schema_cache=None, stream_size=STREAM_SIZE):
+    # without schema_cache the events are generated while the renderer takes them, none are kept in a list
+    if schema_cache:
+        return schema_cache.load(kind, package_file.digest(), package_file.open)
+    return iter_package_events(package_file, kind, stream_size)
+
+
+def iter_package_events(package_file, kind, stream_size):
+    with package_file.open() as inputf:
+        yield from iter_events(inputf, kind, stream_size)
+
+
+def render_package(package_files, pluginFileName, sections=None, readme_format="text", schema_cache=None):
+    # render every JSON of the package in memory, JSON is turned into schema_stream events (json.load below
+    # STREAM_SIZE, the stream parser above) or loaded pre-digested from schema_cache, sections whose source
+    # digest matches the cached key are reused instead of being parsed again
+    renderer = RENDERERS[readme_format]()
+    sections = sections or {}
+    rendered_sections = {}
+    type_files = []
+    section_texts = []
+    for package_file in sorted(package_files, key=lambda package_file: package_file.name):
+        f = package_file.name
         if f.endswith('.json') and f != "index.json":
             if len(f.split('.')) <= 2:
-                inputFile = os.path.join(inputDir, f)
-                create_readme = CreateREADME(inputFile, outputFile, pluginFileName)
-                create_readme.createReadMe()
+                create_readme = CreateREADME(f, None, pluginFileName, renderer)
+
+                def write_plugin(sectionf, package_file=package_file):
+                    create_readme.write_plugin_events(sectionf, schema_events(package_file, "plugin", schema_cache))
+
+                section = render_section(sections, f, content_key(pluginFileName, readme_format, package_file.digest()),
+                                         write_plugin)
+                rendered_sections[f] = section
+                section_texts.append(section['text'])
+            else:
+                type_files.append(package_file)
+
+    def write_types(sectionf):
+        type_renderer = TypeRenderer(CreateREADME(None, None, pluginFileName, renderer))
+        for package_file in type_files:
+            type_renderer.add_type_file(package_file.name, schema_events(package_file, "types", schema_cache))
+        type_renderer.write_types(sectionf)
+
+    # nested types resolve across files, so all type files form one section
+    type_key = content_key(pluginFileName, readme_format,
+                           *[hashlib.sha256(package_file.name.encode()).digest() + package_file.digest()
+                             for package_file in type_files])
+    section = render_section(sections, "Types", type_key, write_types)
+    rendered_sections["Types"] = section
+    section_texts.append(section['text'])
+    return renderer.join(section_texts), rendered_sections
+
+
+class PackageFile:
+    # one JSON file of the package, a tar member is spooled to disk above SPOOL_SIZE
+    # so it can be hashed first and only parsed when its section is not cached
+    def __init__(self, name, path=None, spool=None, digest=None):
+        self.name = name
+        self.path = path
+        self.spool = spool
+        self.content_digest = digest
+
+    @contextlib.contextmanager
+    def open(self):
+        if self.path:
+            with open(self.path, 'rb') as inputf:
+                yield inputf
+        else:
+            self.spool.seek(0)
+            yield self.spool
+
+    def digest(self):
+        if self.content_digest is None:
+            digest = hashlib.sha256()
+            with self.open() as inputf:
+                for chunk in iter(lambda: inputf.read(SPOOL_SIZE), b""):
+                    digest.update(chunk)
+            self.content_digest = digest.digest()
+        return self.content_digest
+
+    def read(self):
+        with self.open() as inputf:
+            return inputf.read()
+
+    def close(self):
+        if self.spool:
+            self.spool.close()
+
+
+class HashingReader:
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.hash = hashlib.sha256()
+
+    def read(self, size=-1):
+        chunk = self.fileobj.read(size)
+        self.hash.update(chunk)
+        return chunk
+
+
+def iter_package_json(inputPath):
+    # yields a PackageFile for every JSON file at the root of the package, in archive order for a tar
+    if os.path.isdir(inputPath):
+        if not any(f.endswith('.json') for f in os.listdir(inputPath)):
+            inputPath = os.path.join(inputPath, os.listdir(inputPath)[0])
+        for f in sorted(os.listdir(inputPath)):
+            if f.endswith('.json'):
+                yield PackageFile(f, path=os.path.join(inputPath, f))
+    else:
+        # only the JSON members are decompressed, nothing is extracted next to the tar
+        with tarfile.open(inputPath, 'r|*') as tar:
+            for member in tar:
+                member_path = member.name[2:] if member.name.startswith("./") else member.name
+                if member.isfile() and member_path.endswith('.json') and member_path.count('/') <= 1:
+                    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+                    reader = HashingReader(tar.extractfile(member))
+                    shutil.copyfileobj(reader, spool, SPOOL_SIZE)
+                    yield PackageFile(os.path.basename(member_path), spool=spool, digest=reader.hash.digest())
+
+
+def generate_readme(inputPath, outputFile, pluginFileName, cache_dir=None, readme_format="text", schema_cache=None):
+    package_files = []
+    index_data = None
+    cache = {}
+    try:
+        for package_file in iter_package_json(inputPath):
+            if package_file.name == "index.json" and cache_dir:
+                index_data = json.loads(package_file.read())
+                package_file.close()
+                cache = load_cache(cache_file_path(cache_dir, index_data, readme_format))
+                if cache.get('index_key') == index_key(index_data, pluginFileName, readme_format) and 'readme' in cache:
+                    write_atomic(outputFile, cache['readme'])
+                    return "cached"
             else:
-                complexDataTypeJSON.append(os.path.join(inputDir, f))
+                package_files.append(package_file)
+
+        content, sections = render_package(package_files, pluginFileName, cache.get('sections'), readme_format,
+                                           schema_cache)
+    finally:
+        for package_file in package_files:
+            package_file.close()
+    if index_data:
+        save_cache(cache_file_path(cache_dir, index_data, readme_format),
+                   {"index_key": index_key(index_data, pluginFileName, readme_format), "sections": sections,
+                    "readme": content})
+    write_atomic(outputFile, content)
+    return "rendered"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="create README.md of a plugin package")
+    parser.add_argument("inputPath", help="plugin tar (.tar.gz) or dir holding the extracted package")
+    parser.add_argument("outputFile")
+    parser.add_argument("pluginFileName")
+    parser.add_argument("--cache-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"),
+                        help="where rendered READMEs are cached, keyed on the index.json hashes")
+    parser.add_argument("--no-cache", action="store_true", help="always render the whole README")
+    parser.add_argument("--format", dest="readme_format", choices=sorted(RENDERERS), default="text",
+                        help="plain text README, GitHub markdown tables or a JSON summary")
+    parser.add_argument("--schema-cache-mb", type=int, default=64,
+                        help="size limit of the parsed schema cache in <cache-dir>/schemas")
+    args = parser.parse_args()
 
-    # print(complexDataTypeJSON)
-    # for json_file in complexDataTypeJSON:
-    #     create_readme = CreateREADME(json_file, outputFile, pluginFileName)
-    #     create_readme.createReadMe()
\ No newline at end of file
+    schema_cache = None
+    if not args.no_cache:
+        schema_cache = SchemaCache(os.path.join(args.cache_dir, "schemas"), args.schema_cache_mb * 1024 * 1024)
+    status = generate_readme(args.inputPath, args.outputFile, args.pluginFileName,
+                             None if args.no_cache else args.cache_dir, args.readme_format, schema_cache)
+    if status == "cached":
+        print(args.pluginFileName + " is unchanged, README.md restored from cache")
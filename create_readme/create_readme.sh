@@ -1,18 +1,32 @@
 plugin_name=$1
 
 source $iso_plugins_automation/config/config.sh
+readme_format=${readme_format:-text}
+
+if [ "$plugin_name" = "--all" ]; then
+  # README of every plugin in plugin_tar_path, rendered in parallel to <output_dir>/<plugin>/README.md
+  output_dir=$iso_plugins_automation/create_readme/readmes
+  if [ "$2" != "" ]; then
+    output_dir=$2
+  fi
+  python3 $iso_plugins_automation/create_readme/batch_readme.py $plugin_tar_path $output_dir --format $readme_format
+  exit $?
+fi
 
 plugin_name_last="${plugin_name##*/}"
 #echo $plugin_name_last
-rm -rf $iso_plugins_automation/create_readme/package
-mkdir -p $iso_plugins_automation/create_readme/package
-
-# untar plugin tar file to package folder
-tar -zxf $plugin_tar_path/$plugin_name_last/`ls $plugin_tar_path/$plugin_name_last | grep -v '_sr' | head -n 1` -C $iso_plugins_automation/create_readme/package
-#plugin_name_without_underscore="${plugin_name//_}"
-
+plugin_tar_file=$plugin_tar_path/$plugin_name_last/`ls $plugin_tar_path/$plugin_name_last | grep -v '_sr' | head -n 1`
 
-# remove underscore from json file
+# every plugin gets its own README path so runs for different plugins never share a file
+output_file=$iso_plugins_automation/create_readme/readmes/$plugin_name_last/README.md
+if [ "$readme_format" = "json" ]; then
+  output_file=$iso_plugins_automation/create_readme/readmes/$plugin_name_last/README.json
+fi
+if [ "$2" != "" ]; then
+  output_file=$2
+fi
+mkdir -p `dirname $output_file`
 
-rm -f $iso_plugins_automation/create_readme/README.md
-python3 $iso_plugins_automation/create_readme/create_readme.py $iso_plugins_automation/create_readme/package/ $iso_plugins_automation/create_readme/README.md $plugin_name_last
\ No newline at end of file
+# JSON files are read straight from the plugin tar file, nothing is extracted to disk
+# README.md is rendered in memory and replaced atomically, a failed run keeps the previous file
+python3 $iso_plugins_automation/create_readme/create_readme.py $plugin_tar_file $output_file $plugin_name_last --format $readme_format && echo "README created at $output_file"
\ No newline at end of file
@@ -0,0 +1,149 @@
+import json
+
+# rows of every table are (depth, name, type, description), a field of a nested type only names the type,
+# which is rendered in its own section under Types
+
+
+def parameter_cell(row, indent="    "):
+    depth, name, type_name, description = row
+    if type_name is None:
+        return indent * depth + name
+    return indent * depth + name + "(" + type_name + ")"
+
+
+class TextRenderer:
+    # plain text README, description column width is computed once per table
+    name = "text"
+    file_name = "README.md"
+
+    def table(self, rows, prefix):
+        cells = [parameter_cell(row) for row in rows]
+        width = max(len(cell) for cell in cells) + 1 if cells else 0
+        return "".join(prefix + cell.ljust(width) + "- " + row[3] + "\n" if row[2] is not None
+                       else prefix + cell + "\n" for cell, row in zip(cells, rows))
+
+    def render_plugin(self, plugin):
+        lines = ["Plugin Parameters :\n\n", self.table(plugin['parameters'], "\t"), "\nCommands :\n"]
+        command_no = 0
+        for command in plugin['commands']:
+            command_no += 1
+            lines.append("\n\t" + str(command_no) + ". " + command['name'] + "\n")
+            lines.append("\t\t" + command['description'] + "\n")
+            lines.append("\t\tinput -\n" + self.table(command['input'], "\t\t\t"))
+            lines.append("\t\toutput -\n" + self.table(command['output'], "\t\t\t"))
+        return "".join(lines)
+
+    def render_types(self, types):
+        if not types:
+            return ""
+        lines = ["\nTypes :\n"]
+        type_no = 0
+        for parameter_type in types:
+            type_no += 1
+            lines.append("\n\t" + str(type_no) + ". " + parameter_type['name'] + "\n")
+            if parameter_type['description']:
+                lines.append("\t\t" + parameter_type['description'] + "\n")
+            if parameter_type['base']:
+                lines.append("\t\tbase - " + parameter_type['base'] + "\n")
+            lines.append("\t\tfields -\n" + self.table(parameter_type['fields'], "\t\t\t"))
+        return "".join(lines)
+
+    def join(self, sections):
+        return "".join(sections)
+
+
+class MarkdownRenderer:
+    # GitHub flavoured markdown, tables are padded to their column widths so the source stays readable
+    name = "markdown"
+    file_name = "README.md"
+
+    def escape(self, cell):
+        return cell.replace("|", "\\|").replace("\r", "").replace("\n", "<br>")
+
+    def table(self, rows, header):
+        table_rows = [[self.escape(parameter_cell(row[:2] + (None, row[3]), "&nbsp;&nbsp;")),
+                       self.escape(row[2] or ""), self.escape(row[3])] for row in rows]
+        # description is left unpadded, one long description would otherwise widen every row
+        widths = [max([len(header[column])] + [len(table_row[column]) for table_row in table_rows])
+                  for column in range(2)] + [len(header[2])]
+        lines = ["| " + " | ".join(cell.ljust(width) for cell, width in zip(header, widths)) + " |\n",
+                 "| " + " | ".join("-" * width for width in widths) + " |\n"]
+        lines.extend("| " + table_row[0].ljust(widths[0]) + " | " + table_row[1].ljust(widths[1]) + " | " +
+                     table_row[2] + " |\n" for table_row in table_rows)
+        return "".join(lines)
+
+    def render_plugin(self, plugin):
+        lines = []
+        if plugin['name']:
+            lines.append("# " + plugin['name'] + "\n\n")
+        if plugin['description']:
+            lines.append(self.escape(plugin['description'].strip()) + "\n\n")
+        lines.append("## Plugin Parameters\n\n")
+        lines.append(self.table(plugin['parameters'], ["Name", "Type", "Description"]))
+        lines.append("\n## Commands\n")
+        command_no = 0
+        for command in plugin['commands']:
+            command_no += 1
+            lines.append("\n### " + str(command_no) + ". " + command['name'] + "\n\n")
+            lines.append(self.escape(command['description']) + "\n\n")
+            lines.append("**Input**\n\n" + self.table(command['input'], ["Name", "Type", "Description"]) + "\n")
+            lines.append("**Output**\n\n" + self.table(command['output'], ["Name", "Type", "Description"]))
+        return "".join(lines)
+
+    def render_types(self, types):
+        if not types:
+            return ""
+        lines = ["\n## Types\n"]
+        type_no = 0
+        for parameter_type in types:
+            type_no += 1
+            lines.append("\n### " + str(type_no) + ". " + parameter_type['name'] + "\n\n")
+            if parameter_type['description']:
+                lines.append(self.escape(parameter_type['description']) + "\n\n")
+            if parameter_type['base']:
+                lines.append("Extends **" + self.escape(parameter_type['base']) + "**\n\n")
+            lines.append(self.table(parameter_type['fields'], ["Field", "Type", "Description"]))
+        return "".join(lines)
+
+    def join(self, sections):
+        return "\n".join(section for section in sections if section)
+
+
+class JsonRenderer:
+    # machine readable summary, every section is a JSON document and join() merges them
+    name = "json"
+    file_name = "README.json"
+
+    def rows(self, rows):
+        return [{"name": name, "type": type_name, "description": description, "depth": depth}
+                for depth, name, type_name, description in rows if type_name is not None]
+
+    def render_plugin(self, plugin):
+        return json.dumps({"plugins": [{
+            "name": plugin['name'],
+            "parameters": self.rows(plugin['parameters']),
+            "commands": [{"name": command['name'], "description": command['description'],
+                          "input": self.rows(command['input']), "output": self.rows(command['output'])}
+                         for command in plugin['commands']],
+        }]})
+
+    def render_types(self, types):
+        return json.dumps({"types": [{"name": parameter_type['name'], "description": parameter_type['description'],
+                                      "base": parameter_type['base'], "fields": self.rows(parameter_type['fields'])}
+                                     for parameter_type in types]})
+
+    def join(self, sections):
+        summary = {"plugins": [], "types": []}
+        for section in sections:
+            if section:
+                for key, values in json.loads(section).items():
+                    summary[key].extend(values)
+        summary["summary"] = {
+            "parameters": sum(len(plugin['parameters']) for plugin in summary['plugins']),
+            "commands": sum(len(plugin['commands']) for plugin in summary['plugins']),
+            "types": len(summary['types']),
+        }
+        return json.dumps(summary, indent=2) + "\n"
+
+
+RENDERERS = {renderer.name: renderer for renderer in (TextRenderer, MarkdownRenderer, JsonRenderer)}
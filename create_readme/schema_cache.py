@@ -0,0 +1,123 @@
+import argparse
+import hashlib
+import marshal
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schema_stream import iter_events  # noqa: E402
+from toolkit.state import write_atomic  # noqa: E402
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "schemas")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SCHEMA_VERSION = 1
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as inputf:
+        for chunk in iter(lambda: inputf.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+class SchemaCache:
+    # parsed plugin/type schemas keyed by the sha256 of the JSON file, stored with marshal,
+    # least recently used entries (by mtime, bumped on every hit) are evicted above max_bytes
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def entry_path(self, kind, digest):
+        # marshal format is only stable within one python version
+        return os.path.join(self.cache_dir, "%s-%d-py%d%d-%s.marshal" % (
+            kind, SCHEMA_VERSION, sys.version_info[0], sys.version_info[1], digest.hex()))
+
+    def get(self, kind, digest):
+        entry_path = self.entry_path(kind, digest)
+        try:
+            with open(entry_path, 'rb') as entryf:
+                events = marshal.loads(entryf.read())
+            os.utime(entry_path)
+            return events
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def put(self, kind, digest, events):
+        write_atomic(self.entry_path(kind, digest), marshal.dumps(events))
+        self.evict()
+
+    def load(self, kind, digest, open_file):
+        # open_file() is a context manager giving the binary JSON, only called on a miss
+        events = self.get(kind, digest)
+        if events is None:
+            with open_file() as inputf:
+                events = list(iter_events(inputf, kind))
+            self.put(kind, digest, events)
+        return events
+
+    def entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if name.endswith(".marshal"):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for mtime, size, name in entries)
+        for mtime, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for mtime, size, name in self.entries():
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+
+def load_schema(path, kind=None, cache=None):
+    # entry point for other tooling: schema_stream events of a plugin or complex type JSON file,
+    # kind defaults to "types" for <plugin>.<Type>.json files like create_readme does
+    if kind is None:
+        kind = "types" if len(os.path.basename(path).split('.')) > 2 else "plugin"
+    cache = cache or SchemaCache()
+    return cache.load(kind, file_digest(path), lambda: open(path, 'rb'))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="inspect or clear the parsed plugin schema cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--clear", action="store_true")
+    parser.add_argument("json_files", nargs="*", help="print a summary of these plugin/type JSON files")
+    args = parser.parse_args()
+
+    cache = SchemaCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+    for json_file in args.json_files:
+        events = load_schema(json_file, cache=cache)
+        if len(os.path.basename(json_file).split('.')) > 2:
+            print("%s: %d types, %d fields" % (json_file, len(events),
+                                               sum(len(parameter_type.get('fields', [])) for parameter_type in events)))
+        else:
+            print("%s: %d parameters, %d commands" % (json_file, sum(1 for event in events if event[0] == "parameter"),
+                                                      sum(1 for event in events if event[0] == "command")))
+    entries = cache.entries()
+    print("%d entries, %.2f MB in %s" % (len(entries), sum(entry[1] for entry in entries) / 2 ** 20, args.cache_dir))
@@ -0,0 +1,196 @@
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+# json.load is faster but holds the whole document, files of STREAM_SIZE bytes or more are parsed as a stream
+STREAM_SIZE = 16 * 1024 * 1024
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[ \t\r\n]*")
+_delimiters = " \t\r\n,:]}"
+
+
+class JsonStream:
+    # incremental reader over a binary JSON file, only the value being decoded is held in memory
+    def __init__(self, fileobj, chunk_size=CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=None):
+        if self.eof:
+            return False
+        chunk = self.fileobj.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.buffer = self.buffer[self.pos:] + self.decoder.decode(b"", final=True)
+        else:
+            self.buffer = self.buffer[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise ValueError("unexpected end of JSON")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("expected %r at offset %d, got %r" % (char, self.pos, self.buffer[self.pos]))
+        self.pos += 1
+
+    def read_value(self):
+        # decode one complete value, reading more whenever it runs past the end of the buffer
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # a number cut by the end of the buffer may continue in the next chunk
+                if self.eof or (end < len(self.buffer) and self.buffer[end] in _delimiters):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill(size)
+            size *= 2
+
+    def iter_array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self
+            separator = self.peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError("expected ',' or ']' in array, got %r" % separator)
+
+    def iter_object(self):
+        # yields every key, the caller must consume its value before asking for the next key
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError("expected ',' or '}' in object, got %r" % separator)
+
+
+def compact_parameter(parameter):
+    # keeps only what the README needs from a ParameterDef, or its [name, ParameterDef] pair
+    param_json = parameter[1] if isinstance(parameter, list) else parameter
+    if not isinstance(param_json, dict):
+        return parameter
+    properties = param_json.get('properties') or {}
+    return {"name": param_json.get('name'), "type": param_json.get('type'),
+            "properties": {"description": properties.get('description')}}
+
+
+def compact_command(base_command):
+    if not isinstance(base_command, dict):
+        return base_command
+    return {
+        "name": base_command.get('name'),
+        "description": base_command.get('description'),
+        "input_parameters": [compact_parameter(parameter) for parameter in base_command.get('input_parameters') or []],
+        "output_parameters": [compact_parameter(parameter)
+                              for parameter in base_command.get('output_parameters') or []],
+    }
+
+
+def iter_plugin_events(fileobj):
+    # ("parameter", ParameterDef), ("command", base command) and ("name"/"description", str) of a plugin JSON
+    stream = JsonStream(fileobj)
+    for key in stream.iter_object():
+        if key == "parameters" and stream.peek() == "[":
+            for item in stream.iter_array():
+                yield "parameter", compact_parameter(item.read_value())
+        elif key == "base_commands" and stream.peek() == "[":
+            for item in stream.iter_array():
+                yield "command", compact_command(item.read_value())
+        elif key in ("name", "description"):
+            yield key, stream.read_value()
+        else:
+            stream.read_value()
+
+
+def plugin_document_events(document):
+    # the events of iter_plugin_events from an already parsed plugin JSON
+    if not isinstance(document, dict):
+        raise ValueError("expected a JSON object, got %s" % type(document).__name__)
+    for key, value in document.items():
+        if key == "parameters" and isinstance(value, list):
+            for parameter in value:
+                yield "parameter", compact_parameter(parameter)
+        elif key == "base_commands" and isinstance(value, list):
+            for base_command in value:
+                yield "command", compact_command(base_command)
+        elif key in ("name", "description"):
+            yield key, value
+
+
+def iter_type_events(fileobj):
+    # one compact ParameterType per type of a complex type JSON, fields are decoded one at a time
+    stream = JsonStream(fileobj)
+    types = stream.iter_array() if stream.peek() == "[" else iter([stream])
+    for item in types:
+        if item.peek() != "{":
+            yield item.read_value()
+            continue
+        parameter_type = {"fields": []}
+        for key in item.iter_object():
+            if key == "fields" and item.peek() == "[":
+                for field in item.iter_array():
+                    parameter_type["fields"].append(compact_parameter(field.read_value()))
+            elif key in ("name", "base", "__description__"):
+                parameter_type[key] = item.read_value()
+            else:
+                item.read_value()
+        yield parameter_type
+
+
+def type_document_events(document):
+    # the events of iter_type_events from an already parsed complex type JSON
+    for parameter_type in document if isinstance(document, list) else [document]:
+        if not isinstance(parameter_type, dict):
+            yield parameter_type
+            continue
+        fields = parameter_type.get('fields')
+        compact_type = {"fields": [compact_parameter(field) for field in fields] if isinstance(fields, list) else []}
+        for key in ("name", "base", "__description__"):
+            if key in parameter_type:
+                compact_type[key] = parameter_type[key]
+        yield compact_type
+
+
+ITER_EVENTS = {"plugin": iter_plugin_events, "types": iter_type_events}
+DOCUMENT_EVENTS = {"plugin": plugin_document_events, "types": type_document_events}
+
+
+def iter_events(fileobj, kind, stream_size=STREAM_SIZE):
+    # schema_stream events of a seekable binary file, json.load below stream_size bytes and the stream parser above
+    start = fileobj.tell()
+    size = fileobj.seek(0, 2) - start
+    fileobj.seek(start)
+    if size < stream_size:
+        return DOCUMENT_EVENTS[kind](json.load(fileobj))
+    return ITER_EVENTS[kind](fileobj)
@@ -0,0 +1,118 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import tarfile
+
+
+def parameter_def(name, description, type_name="String", indicator=None):
+    param_json = {"class": "ParameterDef", "name": name, "properties": {"description": description}, "type": type_name}
+    if indicator:
+        param_json["properties"]["indicator"] = indicator
+    if type_name.endswith(" List"):
+        param_json["list"] = True
+    return param_json
+
+
+def make_plugin_json(command_count, type_names=(), parameter_count=10, input_count=5, output_count=5):
+    # shaped like trellixetp.json/microsoftteams.json: parameters and inputs are [name, ParameterDef] pairs,
+    # outputs are plain ParameterDefs, complex outputs point at the generated types
+    parameters = [[f"param_{i}", parameter_def(f"param_{i}", f"plugin parameter {i}")] for i in range(parameter_count)]
+    base_commands = []
+    for c in range(command_count):
+        output_parameters = [parameter_def(f"output_{i}", f"output {i} of command {c}", indicator="task")
+                             for i in range(output_count)]
+        if type_names:
+            type_name = type_names[c % len(type_names)]
+            output_parameters.append(parameter_def("result", "complex result", type_name + " List"))
+        base_commands.append({
+            "description": f"synthetic command {c}",
+            "input_parameters": [[f"input_{i}", parameter_def(f"input_{i}", f"input {i} of command {c}")]
+                                 for i in range(input_count)],
+            "manual_time": 120,
+            "name": f"command{c}",
+            "output_parameters": output_parameters,
+        })
+    return {"base_commands": base_commands, "class_name": "Synthetic", "description": "synthetic plugin",
+            "file": "synthetic.py", "icon": "synthetic.png", "name": "Synthetic", "parameters": parameters,
+            "tags": ["Benchmark"], "vendor": "Synthetic", "version": "1.0.0"}
+
+
+def make_type_json(type_name, depth, fanout, field_count=5):
+    # a top-level type with <depth> levels of nested types, every level has <fanout> types and each of them
+    # is referenced by every type of the level above, so sub-types are shared like in generated Graph types
+    def level_types(level):
+        return [type_name] if level == 0 else [f"{type_name}.L{level}T{i}" for i in range(fanout)]
+
+    types = []
+    for level in range(depth + 1):
+        for name in level_types(level):
+            fields = [[f"field_{i}", parameter_def(f"field_{i}", f"field {i}")] for i in range(field_count)]
+            if level < depth:
+                fields += [[f"child_{i}", parameter_def(f"child_{i}", "nested type", child + " List")]
+                           for i, child in enumerate(level_types(level + 1))]
+            types.append({"__className__": "ParameterType", "__default_properties__": {"controlType": "custom"},
+                          "__description__": f"synthetic type {name}", "base": None, "fields": fields,
+                          "id": name.replace(".", "/", 1), "name": name, "native_type": "complex"})
+    return types
+
+
+def make_type_list_json(type_count, field_count=20):
+    # <type_count> types chained through a "child" field, for schema size scaling
+    types = []
+    for t in range(type_count):
+        fields = [[f"field_{i}", parameter_def(f"field_{i}", f"field {i} of type {t}")] for i in range(field_count)]
+        if t + 1 < type_count:
+            fields.append(["child", parameter_def("child", "nested type", f"synthetic.Type{t + 1} List")])
+        types.append({"__className__": "ParameterType", "__description__": f"synthetic type {t}", "base": None,
+                      "fields": fields, "id": f"synthetic/Type{t}", "name": f"synthetic.Type{t}",
+                      "native_type": "complex"})
+    return types
+
+
+def make_package_files(command_count, type_count=2, type_depth=3, type_fanout=2, plugin_file_name="synthetic"):
+    # file name -> bytes of a package like microsoft.teams.2.0.0, including index.json with its hash map
+    type_names = [f"{plugin_file_name}.Type{t}" for t in range(type_count)]
+    files = {"synthetic.json": json.dumps(make_plugin_json(command_count, type_names), indent=2).encode()}
+    for type_name in type_names:
+        files[type_name + ".json"] = json.dumps(make_type_json(type_name, type_depth, type_fanout), indent=2).encode()
+    files["synthetic.py"] = b"# synthetic plugin source\n" * (command_count + 1)
+    files["synthetic.png"] = os.urandom(64 * 1024)
+    files["index.json"] = json.dumps({
+        "content": {"files": ["synthetic.png"], "plugins": ["synthetic"], "types": type_names},
+        "hash": {name: hashlib.sha256(files[name]).hexdigest() for name in ("synthetic.png", "synthetic.py")},
+        "name": plugin_file_name, "package-api": "4.0", "vendor": "benchmark", "version": "1.0.0",
+    }, indent=2).encode()
+    return files
+
+
+def write_package_dir(output_dir, files):
+    package_dir = os.path.join(output_dir, "benchmark.synthetic.1.0.0")
+    os.makedirs(package_dir, exist_ok=True)
+    for name, content in files.items():
+        with open(os.path.join(package_dir, name), "wb") as outputf:
+            outputf.write(content)
+    return package_dir
+
+
+def write_package_tar(tar_file, files):
+    with tarfile.open(tar_file, "w:gz") as tar:
+        for name in sorted(files):
+            info = tarfile.TarInfo("benchmark.synthetic.1.0.0/" + name)
+            info.size = len(files[name])
+            tar.addfile(info, io.BytesIO(files[name]))
+    return tar_file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="write a synthetic plugin tar for create_readme benchmarks")
+    parser.add_argument("tar_file")
+    parser.add_argument("--commands", type=int, default=100)
+    parser.add_argument("--types", type=int, default=2)
+    parser.add_argument("--type-depth", type=int, default=3)
+    parser.add_argument("--type-fanout", type=int, default=2)
+    args = parser.parse_args()
+
+    write_package_tar(args.tar_file, make_package_files(args.commands, args.types, args.type_depth, args.type_fanout))
+    print("%s: %d commands, %d types of depth %d" % (args.tar_file, args.commands, args.types, args.type_depth))
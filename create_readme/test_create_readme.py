@@ -0,0 +1,79 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from create_readme import PackageFile, iter_package_json, render_package, schema_events
+from synthetic_plugin import make_plugin_json, make_type_json, make_type_list_json
+
+
+class TypeSectionsTest(unittest.TestCase):
+    def setUp(self):
+        self.package_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.package_dir)
+
+    def write(self, name, data):
+        with open(os.path.join(self.package_dir, name), "w") as outputf:
+            json.dump(data, outputf)
+
+    def render(self, readme_format):
+        package_files = list(iter_package_json(self.package_dir))
+        try:
+            return render_package(package_files, "synthetic", readme_format=readme_format)[0]
+        finally:
+            for package_file in package_files:
+                package_file.close()
+
+    def test_shared_sub_type_is_rendered_once(self):
+        # every type of a level is referenced by every type of the level above, L3T0 by 9 fields on 3 paths
+        self.write("synthetic.json", make_plugin_json(2, ["synthetic.Type0"]))
+        self.write("synthetic.Type0.json", make_type_json("synthetic.Type0", depth=3, fanout=3))
+        text = self.render("text")
+        self.assertEqual(text.count(". Type0.L3T0\n"), 1)
+        self.assertEqual(text.count("(Type0.L3T0 List)"), 3)
+        markdown = self.render("markdown")
+        self.assertEqual(markdown.count(". Type0.L3T0\n"), 1)
+        summary = json.loads(self.render("json"))
+        names = [parameter_type["name"] for parameter_type in summary["types"]]
+        self.assertEqual(names.count("Type0.L3T0"), 1)
+        self.assertEqual(len(names), 1 + 3 * 3)
+
+    def test_long_type_chain(self):
+        self.write("synthetic.json", make_plugin_json(1, ["synthetic.Type0"]))
+        self.write("synthetic.Type0.json", make_type_list_json(1500, field_count=2))
+        summary = json.loads(self.render("json"))
+        self.assertEqual(len(summary["types"]), 1500)
+
+    def test_base_type(self):
+        self.write("synthetic.json", make_plugin_json(1))
+        base, derived = make_type_list_json(2, field_count=1)
+        derived["name"] = "synthetic.Derived"
+        derived["base"] = base["name"]
+        self.write("synthetic.Derived.json", [derived, base])
+        summary = json.loads(self.render("json"))
+        self.assertEqual([(t["name"], t["base"]) for t in summary["types"]], [("Derived", "Type0"), ("Type0", None)])
+
+
+class SchemaEventsTest(unittest.TestCase):
+    def test_json_load_and_stream_give_the_same_events(self):
+        package_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "package", "microsoft.teams.2.0.0")
+        for package_file in iter_package_json(package_dir):
+            if package_file.name == "index.json":
+                continue
+            kind = "types" if len(package_file.name.split('.')) > 2 else "plugin"
+            self.assertEqual(list(schema_events(package_file, kind, stream_size=float("inf"))),
+                             list(schema_events(package_file, kind, stream_size=0)), package_file.name)
+
+    def test_events_are_not_collected(self):
+        package_file = PackageFile("synthetic.json", spool=io.BytesIO(json.dumps(make_plugin_json(3)).encode()))
+        events = schema_events(package_file, "plugin")
+        self.assertNotIsInstance(events, list)
+        self.assertEqual(sum(1 for event, value in events if event == "command"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
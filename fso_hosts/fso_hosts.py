@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+TOOLKIT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOSTS_FILE = os.path.join(TOOLKIT_DIR, "config", "hosts")
+LINE_LIMIT = 2 ** 20
+
+# alias name -> script, the same commands as the README aliases that talk to the FSO Machine, local only commands
+# (create_readme) would do the same work once per host and are left out
+COMMANDS = {
+    "install_package": "install_package/install_package.sh",
+    "uninstall_package": "uninstall_package/uninstall_package.sh",
+    "list_installed_packages": "installed_packages/installed_packages.sh",
+    "restart_fso": "restart_fso/restart_fso.sh",
+    "fso_status": "fso_status/fso_status.sh",
+    "unittest": "unittest/unittest.sh",
+    "load_snapshot": "snapshot/load_snapshot.sh",
+    "save_snapshot": "snapshot/save_snapshot.sh",
+    "fso_reset": "fso_reset/fso_reset.sh",
+    "reset_password": "reset_password/reset_password.sh",
+    "send": "send/send.sh",
+    "receive": "receive/receive.sh",
+    "generate_tar": "generate_tar/generate_tar.sh",
+    "get_log": "log/get_log.sh",
+    "clear_log": "log/clear_log.sh",
+    "fso_session": "fso_session/fso_session.sh",
+}
+
+
+def script_path(command):
+    return os.path.join(TOOLKIT_DIR, COMMANDS[command])
+
+
+def config_plugin_tar_path():
+    # plugin_tar_path of config/config.sh, every host gets <plugin_tar_path>/<host name> under it
+    return subprocess.run(["sh", "-c", '. "$iso_plugins_automation/config/config.sh"; printf %s "$plugin_tar_path"'],
+                          env=dict(os.environ, iso_plugins_automation=TOOLKIT_DIR), stdout=subprocess.PIPE,
+                          check=True).stdout.decode()
+
+
+def read_hosts(hosts_file=HOSTS_FILE):
+    # <name> <remote_ip> per line, # comments
+    hosts = {}
+    with open(hosts_file) as hostsf:
+        for line in hostsf:
+            fields = line.split("#", 1)[0].split()
+            if len(fields) >= 2:
+                hosts[fields[0]] = fields[1]
+            elif fields:
+                print("ignoring host line: " + line.strip())
+    return hosts
+
+
+async def read_lines(stream):
+    # lines of the output, a line longer than LINE_LIMIT comes in pieces, only the last one ends with a newline
+    while True:
+        try:
+            line = await stream.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            line = e.partial
+        except asyncio.LimitOverrunError as e:
+            line = await stream.read(e.consumed)
+        if not line:
+            return
+        yield line
+
+
+async def run_on_host(name, remote_ip, command, args, semaphore, output, log_dir, plugin_tar_path):
+    # the script sees fso_host_ip/fso_host_plugin_tar_path and config/remote.sh points it at that host
+    async with semaphore:
+        env = dict(os.environ, iso_plugins_automation=TOOLKIT_DIR, fso_host_ip=remote_ip,
+                   fso_host_plugin_tar_path=os.path.join(plugin_tar_path, name))
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            "sh", script_path(command), *args, env=env, stdin=asyncio.subprocess.DEVNULL, limit=LINE_LIMIT,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, start_new_session=True)
+        lines = []
+        logf = open(os.path.join(log_dir, name + ".log"), "wb") if log_dir else None
+        try:
+            async for line in read_lines(process.stdout):
+                if output == "stream":
+                    # every piece of a long line is a line of its own, the other hosts write between them
+                    sys.stdout.buffer.write(b"[" + name.encode() + b"] " + line +
+                                            (b"" if line.endswith(b"\n") else b"\n"))
+                    sys.stdout.buffer.flush()
+                else:
+                    lines.append(line)
+                if logf:
+                    logf.write(line)
+            exit_code = await process.wait()
+        except asyncio.CancelledError:
+            os.killpg(process.pid, signal.SIGTERM)
+            raise
+        finally:
+            if logf:
+                logf.close()
+        elapsed = time.perf_counter() - start
+        if output == "group":
+            sys.stdout.write("===== %s (%s) exit %d, %.1fs =====\n" % (name, remote_ip, exit_code, elapsed))
+            sys.stdout.flush()
+            sys.stdout.buffer.write(b"".join(lines))
+            sys.stdout.buffer.flush()
+        return name, remote_ip, exit_code, elapsed
+
+
+async def fan_out(hosts, command, args, jobs, output, log_dir, plugin_tar_path):
+    semaphore = asyncio.Semaphore(jobs)
+    return await asyncio.gather(*[run_on_host(name, remote_ip, command, args, semaphore, output, log_dir,
+                                              plugin_tar_path)
+                                  for name, remote_ip in hosts.items()])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="run a toolkit command on several FSO hosts of config/hosts at once")
+    parser.add_argument("--hosts", help="comma separated host names, default every host")
+    parser.add_argument("--hosts-file", default=HOSTS_FILE)
+    parser.add_argument("--jobs", type=int, default=0, help="hosts at a time, default all of them")
+    parser.add_argument("--output", choices=["stream", "group"], default="stream",
+                        help="stream: lines prefixed with [host] as they come, group: each host's output when it is done")
+    parser.add_argument("--log-dir", help="also write the output of every host to <log_dir>/<host>.log")
+    parser.add_argument("--list", action="store_true", help="print the hosts and exit")
+    parser.add_argument("command", nargs="?", choices=sorted(COMMANDS))
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    hosts = read_hosts(args.hosts_file)
+    if args.hosts:
+        unknown = [name for name in args.hosts.split(",") if name not in hosts]
+        if unknown:
+            print("unknown hosts: %s (see %s)" % (", ".join(unknown), args.hosts_file))
+            sys.exit(2)
+        hosts = {name: hosts[name] for name in args.hosts.split(",")}
+    if args.list or not args.command:
+        for name, remote_ip in hosts.items():
+            print("%-20s %s" % (name, remote_ip))
+        sys.exit(0 if args.list else 2)
+    if not hosts:
+        print("no hosts in " + args.hosts_file)
+        sys.exit(2)
+    if args.log_dir:
+        os.makedirs(args.log_dir, exist_ok=True)
+    plugin_tar_path = config_plugin_tar_path()
+    for name in hosts:
+        os.makedirs(os.path.join(plugin_tar_path, name), exist_ok=True)
+
+    start = time.perf_counter()
+    try:
+        results = asyncio.run(fan_out(hosts, args.command, args.args, args.jobs or len(hosts), args.output,
+                                      args.log_dir, plugin_tar_path))
+    except KeyboardInterrupt:
+        sys.exit(130)
+    print("\n%-20s %-16s %6s %10s" % ("host", "remote_ip", "exit", "time(s)"))
+    for name, remote_ip, exit_code, elapsed in results:
+        print("%-20s %-16s %6d %10.1f" % (name, remote_ip, exit_code, elapsed))
+    failed = sum(1 for result in results if result[2] != 0)
+    print("%d hosts, %d failed, %.1fs wall time, %.1fs serial time" % (
+        len(results), failed, time.perf_counter() - start, sum(result[3] for result in results)))
+    sys.exit(1 if failed else 0)
@@ -1,5 +1,6 @@
 source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
 echo "Performing a reset will destroy ALL FSO, postgres data,
 The FSO service will be stopped during the process.
 Are you sure you want to proceed and reset all data? [y/N]"
-ssh $user@$remote_ip "cd /opt/fireeye/fso &&  bin/fso reset"
\ No newline at end of file
+remote_ssh $user "cd /opt/fireeye/fso &&  bin/fso reset"
\ No newline at end of file
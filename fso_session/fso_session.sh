@@ -0,0 +1,20 @@
+source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
+
+# status (default), open or close the shared ssh sessions of root and ixoperator
+for session_user in root ixoperator; do
+  if [ "$1" = "close" ]; then
+    remote_session_close $session_user
+    echo "$session_user@$remote_ip session closed"
+  elif [ "$1" = "open" ]; then
+    if remote_session $session_user >/dev/null 2>&1; then
+      echo "$session_user@$remote_ip session is up"
+    else
+      echo "can not open $session_user@$remote_ip session"
+    fi
+  elif ssh $ssh_options -O check $session_user@$remote_ip 2>/dev/null; then
+    echo "$session_user@$remote_ip session is up, closes after $ssh_idle_timeout idle"
+  else
+    echo "no $session_user@$remote_ip session, next command opens it"
+  fi
+done
@@ -1,3 +1,4 @@
 source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
 
-ssh $user@$remote_ip 'systemctl status fso && systemctl status fso-web'
\ No newline at end of file
+remote_ssh $user 'systemctl status fso && systemctl status fso-web'
\ No newline at end of file
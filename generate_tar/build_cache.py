@@ -0,0 +1,96 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+TOOLKIT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(TOOLKIT_DIR)
+sys.path.append(os.path.join(TOOLKIT_DIR, "sync_plugin"))
+
+from sync_plugin import build_manifest, manifest_digest  # noqa: E402
+from toolkit.state import state_path  # noqa: E402
+
+CACHE_DIR = state_path("build_cache")
+MAX_ENTRIES = 20
+BUILD_CACHE_VERSION = 1
+
+
+def build_key(plugin_dir, options):
+    # the same plugin tree packaged with the same options gives the same tars
+    return hashlib.sha256(json.dumps({"tree": manifest_digest(build_manifest(os.path.abspath(plugin_dir))),
+                                      "options": options, "version": BUILD_CACHE_VERSION}).encode()).hexdigest()
+
+
+def replace_files(source_dir, plugin_tar_dir):
+    # plugin_tar_dir ends up with exactly the tars of source_dir, copy2 keeps the mtimes so an
+    # unchanged tar is skipped by rsync -t
+    os.makedirs(plugin_tar_dir, exist_ok=True)
+    names = set(os.listdir(source_dir))
+    for name in os.listdir(plugin_tar_dir):
+        path = os.path.join(plugin_tar_dir, name)
+        if name not in names and os.path.isfile(path):
+            os.remove(path)
+    for name in names:
+        shutil.copy2(os.path.join(source_dir, name), os.path.join(plugin_tar_dir, name))
+
+
+def restore(key, plugin_tar_dir, cache_dir=CACHE_DIR):
+    entry = os.path.join(cache_dir, key)
+    if not os.path.isdir(entry) or not os.listdir(entry):
+        return False
+    replace_files(entry, plugin_tar_dir)
+    os.utime(entry)
+    return True
+
+
+def store(key, plugin_tar_dir, cache_dir=CACHE_DIR, max_entries=MAX_ENTRIES):
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=cache_dir, prefix=".staging.")
+    try:
+        for name in os.listdir(plugin_tar_dir):
+            if os.path.isfile(os.path.join(plugin_tar_dir, name)):
+                shutil.copy2(os.path.join(plugin_tar_dir, name), os.path.join(staging, name))
+        entry = os.path.join(cache_dir, key)
+        if os.path.isdir(entry):
+            shutil.rmtree(entry)
+        os.rename(staging, entry)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    evict(cache_dir, max_entries)
+
+
+def evict(cache_dir=CACHE_DIR, max_entries=MAX_ENTRIES):
+    # least recently used builds first, restore() bumps the mtime of an entry
+    entries = sorted((os.stat(os.path.join(cache_dir, name)).st_mtime, name) for name in os.listdir(cache_dir)
+                     if not name.startswith("."))
+    for mtime, name in entries[:max(0, len(entries) - max_entries)]:
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="cache of the sr/non-sr tars built by generate_tar")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    key_parser = subparsers.add_parser("key", help="print the cache key of a plugin tree and packaging options")
+    key_parser.add_argument("plugin_dir")
+    key_parser.add_argument("options", nargs="*")
+    restore_parser = subparsers.add_parser("restore", help="copy the cached tars to plugin_tar_dir, exit 1 on a miss")
+    restore_parser.add_argument("key")
+    restore_parser.add_argument("plugin_tar_dir")
+    store_parser = subparsers.add_parser("store", help="cache the tars in plugin_tar_dir")
+    store_parser.add_argument("key")
+    store_parser.add_argument("plugin_tar_dir")
+    subparsers.add_parser("clear", help="remove every cached build")
+    args = parser.parse_args()
+
+    if args.action == "key":
+        print(build_key(args.plugin_dir, args.options))
+    elif args.action == "restore":
+        sys.exit(0 if restore(args.key, args.plugin_tar_dir) else 1)
+    elif args.action == "store":
+        store(args.key, args.plugin_tar_dir)
+    else:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
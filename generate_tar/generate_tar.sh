@@ -1,14 +1,39 @@
 plugin_name=$1
 
 source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
 
-if [ "$2" != "" ]; then
+# generate_tar <plugin_vendor>/<plugin_name> [<plugin_tar_path>] [--rebuild]
+rebuild=""
+if [ "$2" = "--rebuild" ] || [ "$3" = "--rebuild" ]; then
+    rebuild="--rebuild"
+fi
+if [ "$2" != "" ] && [ "$2" != "--rebuild" ]; then
     plugin_tar_path=$2
 fi
 
 plugin_name_last="${plugin_name##*/}"
+plugin_tar_dir=$plugin_tar_path/$plugin_name_last
+wheel_cache_mb=${wheel_cache_mb:-2048}
 
-rsync -r $iso_plugin_path$plugin_name $user@$remote_ip:/opt/fireeye/fso/source/
-ssh $user@$remote_ip "cd /opt/fireeye/fso && source config/iso_package_dev_env && rm -rvf target/$plugin_name_last && apps/engine/python/bin/package_plugin -f source/$plugin_name_last -o target/$plugin_name_last --include-deps && apps/engine/python/bin/package_plugin -f source/$plugin_name_last -o target/$plugin_name_last"
-rsync -r $user@$remote_ip:/opt/fireeye/fso/target/$plugin_name_last $plugin_tar_path
+# the sr and non-sr tars of a plugin tree that was built before come from the local build cache, the FSO
+# version is part of the key as the packager comes with FSO, so FSO Machines of one version share the builds
+fso_version=$(remote_ssh $user "cd /opt/fireeye/fso && bin/fso version </dev/null")
+if [ $? -ne 0 ] || [ "$fso_version" = "" ]; then
+  echo "could not read the FSO version from $remote_ip"
+  exit 1
+fi
+build_key=$(python3 $iso_plugins_automation/generate_tar/build_cache.py key $iso_plugin_path$plugin_name -- "fso $fso_version" --include-deps plain) || exit 1
+if [ "$rebuild" = "" ] && python3 $iso_plugins_automation/generate_tar/build_cache.py restore $build_key $plugin_tar_dir; then
+  echo "$plugin_name_last is unchanged, tars restored from the build cache to $plugin_tar_dir"
+  exit 0
+fi
 
+# only files changed since the last sync are sent, see sync_plugin/sync_plugin.py
+python3 $iso_plugins_automation/sync_plugin/sync_plugin.py $user $iso_plugin_path$plugin_name /opt/fireeye/fso/source || exit 1
+# both packages are built in one pass on the FSO Machine, see package_remote.sh and wheel_cache.sh
+{ echo "fso_python=$fso_python"; cat $iso_plugins_automation/generate_tar/wheel_cache.sh $iso_plugins_automation/generate_tar/package_remote.sh; } | remote_ssh $user "bash -s -- $plugin_name_last $wheel_cache_mb" || exit 1
+# plugin_tar_dir holds the tars of the last build only
+mkdir -p $plugin_tar_dir
+remote_rsync $user -rt --delete $user@$remote_ip:/opt/fireeye/fso/target/$plugin_name_last/ $plugin_tar_dir/ || exit 1
+python3 $iso_plugins_automation/generate_tar/build_cache.py store $build_key $plugin_tar_dir
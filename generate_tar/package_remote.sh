@@ -0,0 +1,52 @@
+##     -----****----runs on the FSO Machine, after wheel_cache.sh----****----
+# sr (--include-deps) and non-sr packages are built at the same time into their own staging dir and moved to
+# target/<plugin> when both succeeded, the non-sr build reads a hard-linked copy of the source so the two
+# package_plugin runs never write into the same dir
+# $1 plugin name, $2 wheel cache size in MB
+
+cd /opt/fireeye/fso && source config/iso_package_dev_env
+plugin=$1
+wheel_cache_mb=$2
+
+# runs in the background, so the pip settings of the wheel cache never reach the non-sr build
+build_sr() {
+  wheel_cache_prepare source/$plugin $wheel_cache_mb
+  if apps/engine/python/bin/package_plugin -f source/$plugin -o target/.$plugin.sr/out --include-deps; then
+    if [ "$PIP_NO_INDEX" != "" ]; then
+      wheel_cache_check
+    fi
+    return 0
+  fi
+  if [ "$PIP_NO_INDEX" = "" ]; then
+    return 1
+  fi
+  echo "retrying without the wheel cache"
+  rm -f $PIP_LOG
+  unset PIP_FIND_LINKS PIP_NO_INDEX PIP_LOG
+  rm -rf target/.$plugin.sr/out
+  apps/engine/python/bin/package_plugin -f source/$plugin -o target/.$plugin.sr/out --include-deps || return 1
+  # only the cached wheels were wrong, the next builds of this requirement set do not try them again
+  wheel_cache_mark_failed $wheel_cache_entry "the build with the cached wheels failed, without them it worked"
+}
+
+rm -rf target/$plugin target/.$plugin.sr target/.$plugin.non_sr
+mkdir -p target/.$plugin.non_sr/source && cp -al source/$plugin target/.$plugin.non_sr/source/
+build_sr > target/.$plugin.sr.log 2>&1 &
+sr_pid=$!
+apps/engine/python/bin/package_plugin -f target/.$plugin.non_sr/source/$plugin -o target/.$plugin.non_sr/out > target/.$plugin.non_sr.log 2>&1 &
+non_sr_pid=$!
+wait $sr_pid
+sr_status=$?
+wait $non_sr_pid
+non_sr_status=$?
+sed "s/^/[sr] /" target/.$plugin.sr.log
+sed "s/^/[non-sr] /" target/.$plugin.non_sr.log
+if [ $sr_status -eq 0 ] && [ $non_sr_status -eq 0 ]; then
+  mkdir -p target/$plugin && mv target/.$plugin.sr/out/* target/.$plugin.non_sr/out/* target/$plugin/
+  build_status=$?
+else
+  echo "package_plugin failed: sr exit $sr_status, non-sr exit $non_sr_status"
+  build_status=1
+fi
+rm -rf target/.$plugin.sr target/.$plugin.non_sr target/.$plugin.sr.log target/.$plugin.non_sr.log
+exit $build_status
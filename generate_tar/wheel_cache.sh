@@ -0,0 +1,121 @@
+##     -----****----dependency wheel cache on the FSO Machine----****----
+# runs on the FSO Machine before package_plugin --include-deps, the wheels of a plugin's requirement set are
+# collected once into $wheel_cache_dir/<key> and pip of package_plugin installs from there without an index,
+# key is the sha256 of the requirement set and the ABI of the FSO python so plugins with the same
+# dependencies share one entry, least recently used entries go first above wheel_cache_mb
+# a key whose wheels could not be collected, or that package_plugin did not use, is marked <key>.failed and
+# built without the cache until the mark is wheel_cache_failed_ttl minutes old
+# fso_python comes from config/remote.sh, generate_tar sends it ahead of this file
+
+wheel_cache_dir=/opt/fireeye/fso/.wheel_cache
+wheel_cache_failed_ttl=1440
+
+# "name==version" per line, sorted, from the __dependency__ of the plugin .py files and requirements.txt
+plugin_requirements() {
+  $fso_python - "$1" <<'PYTHON'
+import ast
+import glob
+import json
+import os
+import sys
+
+requirements = set()
+for path in glob.glob(os.path.join(sys.argv[1], "*.py")):
+    dependency = None
+    with open(path) as sourcef:
+        for node in ast.parse(sourcef.read()).body:
+            if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == "__dependency__" for target in node.targets):
+                dependency = ast.literal_eval(node.value)
+    if dependency:
+        requirements.update("%s==%s" % (name.lower(), version) for name, version in json.loads(dependency).items())
+requirements_file = os.path.join(sys.argv[1], "requirements.txt")
+if os.path.exists(requirements_file):
+    with open(requirements_file) as requirementsf:
+        requirements.update(line.split("#")[0].strip() for line in requirementsf if line.split("#")[0].strip())
+print("\n".join(sorted(requirements)))
+PYTHON
+}
+
+wheel_cache_key() {
+  abi=$($fso_python -c 'import sys, sysconfig; print(sys.implementation.cache_tag + "-" + sysconfig.get_platform())')
+  printf '%s\n%s\n' "$abi" "$1" | sha256sum | cut -c1-32
+}
+
+# $1 key, $2 reason
+wheel_cache_mark_failed() {
+  echo "$2" > $wheel_cache_dir/$1.failed
+  echo "wheel cache: $2, building $1 without the cache for $wheel_cache_failed_ttl minutes"
+}
+
+# $1 max size in MB, $2 entry that is kept
+wheel_cache_evict() {
+  total=$(du -sk $wheel_cache_dir | cut -f1)
+  for entry in $(ls -tr $wheel_cache_dir); do
+    if [ $total -le $(( $1 * 1024 )) ]; then
+      break
+    fi
+    if [ "$entry" != "$2" ]; then
+      size=$(du -sk $wheel_cache_dir/$entry | cut -f1)
+      rm -rf $wheel_cache_dir/$entry
+      total=$(( total - size ))
+      echo "wheel cache: evicted $entry (${size}KB)"
+    fi
+  done
+  if [ $total -gt $(( $1 * 1024 )) ]; then
+    rm -rf $wheel_cache_dir/.pip_cache
+  fi
+  # temp dirs of interrupted builds, expired failed marks
+  find $wheel_cache_dir -maxdepth 1 -name '.tmp.*' -mmin +60 -exec rm -rf {} +
+  find $wheel_cache_dir -maxdepth 1 -name '*.failed' -mmin +$wheel_cache_failed_ttl -exec rm -f {} +
+}
+
+# $1 plugin source dir, $2 max size in MB, exports the pip settings for package_plugin
+wheel_cache_prepare() {
+  requirements=$(plugin_requirements $1) || return 0
+  if [ "$requirements" = "" ]; then
+    return 0
+  fi
+  mkdir -p $wheel_cache_dir
+  key=$(wheel_cache_key "$requirements")
+  wheel_dir=$wheel_cache_dir/$key
+  if [ "$(find $wheel_cache_dir -maxdepth 1 -name $key.failed -mmin -$wheel_cache_failed_ttl)" != "" ]; then
+    echo "wheel cache: skipping $key, $(cat $wheel_dir.failed)"
+    return 0
+  fi
+  if [ ! -f $wheel_dir/.complete ]; then
+    # collected into a temp dir and renamed, a concurrent build of the same key never sees half an entry;
+    # pip's own download cache is shared by every entry
+    tmp_dir=$(mktemp -d $wheel_cache_dir/.tmp.XXXXXX) && chmod 755 $tmp_dir
+    echo "$requirements" > $tmp_dir/requirements.txt
+    if PIP_CACHE_DIR=$wheel_cache_dir/.pip_cache $fso_python -m pip wheel -q -r $tmp_dir/requirements.txt -w $tmp_dir; then
+      touch $tmp_dir/.complete
+      rm -rf $wheel_dir $wheel_dir.failed
+      mv $tmp_dir $wheel_dir || rm -rf $tmp_dir
+      echo "wheel cache: collected $(ls $wheel_dir | grep -c '\.whl$') wheels for $(echo $requirements)"
+    else
+      rm -rf $tmp_dir
+      wheel_cache_mark_failed $key "pip wheel could not collect $(echo $requirements)"
+      return 0
+    fi
+  else
+    echo "wheel cache: using $key for $(echo $requirements)"
+  fi
+  touch $wheel_dir
+  wheel_cache_evict $2 $key
+  # pip's log tells wheel_cache_check whether package_plugin installed through pip with these settings
+  wheel_cache_entry=$key
+  export PIP_FIND_LINKS=$wheel_dir PIP_NO_INDEX=1 PIP_LOG=$(mktemp $wheel_cache_dir/.tmp.XXXXXX)
+}
+
+# after a build with the pip settings of wheel_cache_prepare, marks the key failed when pip never looked in
+# the cache (package_plugin does not run pip or drops its environment)
+wheel_cache_check() {
+  if grep -q "Looking in links: .*$wheel_cache_dir/$wheel_cache_entry" $PIP_LOG 2>/dev/null; then
+    echo "wheel cache: package_plugin installed from $wheel_cache_entry"
+  else
+    wheel_cache_mark_failed $wheel_cache_entry "package_plugin did not install through pip with PIP_FIND_LINKS"
+  fi
+  rm -f $PIP_LOG
+}
+
+# -----------------------------*****--------------------------------------
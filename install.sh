@@ -1,4 +1,5 @@
 source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
 
 ID_FILE="${HOME}/.ssh/id_rsa.pub"
 
@@ -14,5 +15,5 @@ ssh-copy-id -i $ID_FILE ixoperator@$remote_ip
 
 echo "Successfully configured SSH Key-Based Authentication on remote machine with ip $remote_ip"
 
-ssh $user@$remote_ip 'cd /opt/fireeye/fso && mkdir source;mkdir target;mkdir snapshot;setfacl -m u:ixoperator:rwx snapshot'
+remote_ssh $user 'cd /opt/fireeye/fso && mkdir source;mkdir target;mkdir snapshot;setfacl -m u:ixoperator:rwx snapshot'
 
@@ -1,29 +1,32 @@
 source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
 user="ixoperator"
 
 if [ -f $1 ]; then
-  rsync $1 root@$remote_ip:/opt/fireeye/fso/target/
+  remote_rsync root $1 root@$remote_ip:/opt/fireeye/fso/target/
   plugin_tar_filename="${1##*/}"
   echo $plugin_tar_filename
-  ssh $user@$remote_ip "cd /opt/fireeye/fso &&  bin/fso package install --force-reinstall target/$plugin_tar_filename"
+  remote_ssh $user "cd /opt/fireeye/fso &&  bin/fso package install --force-reinstall target/$plugin_tar_filename"
 #  ssh
 else
   plugin_name=$1
   plugin_last_name="${plugin_name##*/}"
 
-  sh $iso_plugins_automation/generate_tar/generate_tar.sh $1
+  sh $iso_plugins_automation/generate_tar/generate_tar.sh $1 || exit 1
 
+  force=""
+  package_type=$2
   if [ "$2" == "--force" ]; then
-    if [ "$3" == "sr" ]; then
-      ssh $user@$remote_ip "cd /opt/fireeye/fso &&  bin/fso package install --force-reinstall target/$plugin_last_name/${target/$plugin_last_name | head -1}"
-    else
-      ssh $user@$remote_ip "cd /opt/fireeye/fso &&  bin/fso package install --force-reinstall target/$plugin_last_name/${target/$plugin_last_name | tail -n1}"
-    fi
+    force="--force-reinstall"
+    package_type=$3
+  fi
+  # the tar is sent from plugin_tar_path as a build restored from the build cache is not in target/ on the FSO Machine,
+  # rsync -t skips it when the FSO Machine already has the same tar
+  if [ "$package_type" == "sr" ]; then
+    plugin_tar_filename=$(ls $plugin_tar_path/$plugin_last_name | grep '_sr' | head -1)
   else
-    if [ "$2" == "sr" ]; then
-      ssh $user@$remote_ip "cd /opt/fireeye/fso &&  bin/fso package install target/$plugin_last_name/${target/$plugin_last_name | head -1}"
-    else
-      ssh $user@$remote_ip "cd /opt/fireeye/fso &&  bin/fso package install target/$plugin_last_name/${target/$plugin_last_name | tail -n1}"
-    fi
+    plugin_tar_filename=$(ls $plugin_tar_path/$plugin_last_name | grep -v '_sr' | head -1)
   fi
-fi
\ No newline at end of file
+  remote_rsync root -t $plugin_tar_path/$plugin_last_name/$plugin_tar_filename root@$remote_ip:/opt/fireeye/fso/target/$plugin_last_name/
+  remote_ssh $user "cd /opt/fireeye/fso &&  bin/fso package install $force target/$plugin_last_name/$plugin_tar_filename"
+fi
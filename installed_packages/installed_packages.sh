@@ -1,4 +1,5 @@
 source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
 user="ixoperator"
 
-ssh $user@$remote_ip 'cd /opt/fireeye/fso &&  bin/fso package list'
\ No newline at end of file
+remote_ssh $user 'cd /opt/fireeye/fso &&  bin/fso package list'
\ No newline at end of file
@@ -1,2 +1,3 @@
 source $iso_plugins_automation/config/config.sh
-ssh $user@$remote_ip "cat /dev/null > /var/log/fireeye/fso/web/web.log"
\ No newline at end of file
+source $iso_plugins_automation/config/remote.sh
+remote_ssh $user "cat /dev/null > /var/log/fireeye/fso/web/web.log"
\ No newline at end of file
@@ -0,0 +1,189 @@
+import argparse
+import gzip
+import json
+import os
+import shlex
+import subprocess
+import sys
+
+TOOLKIT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(TOOLKIT_DIR)
+
+from toolkit.remote import remote_ssh  # noqa: E402
+from toolkit.state import state_path, write_atomic  # noqa: E402
+import log_index  # noqa: E402
+
+STATE_DIR = state_path("log_fetch")
+ARCHIVE_DIR = state_path("logs")
+LOG_FILE = "/var/log/fireeye/fso/web/web.log"
+COPY_SIZE = 1024 * 1024
+
+# runs on the FSO Machine: bash -s -- <log_file> <inode> <offset> <check_size> <check_sum>
+# the first check_size bytes of the log must still hash to check_sum for the offset to be trusted, that finds
+# a log that was truncated (clear_log) and rewritten past the old offset, or a reused inode
+# the output, gzipped, is a header line of space separated words per part followed by exactly <end> - <start>
+# bytes of the file, a file name is sent as its length in the header and the name itself before the bytes
+#   ROTATED <start> <end> <name_size>   rest of the log we read before, renamed by log rotation, from 0 when the
+#                                       renamed file is shorter than the saved offset
+#   RESET <reason>                      the saved offset is of no use, the log is read from its start
+#   CURRENT <inode> <start> <end> <check_size> <check_sum>
+REMOTE_SCRIPT = r'''
+log_file=$1 saved_inode=$2 offset=$3 check_size=$4 check_sum=$5
+fingerprint() {
+  head -c $2 "$1" | md5sum | cut -d' ' -f1
+}
+send() {
+  printf '%s' "$4"
+  tail -c +$(( $2 + 1 )) "$1" | head -c $(( $3 - $2 ))
+}
+{
+  if [ ! -f "$log_file" ]; then
+    echo "MISSING"
+    exit 0
+  fi
+  current=$(stat -c '%i %s' "$log_file")
+  inode=${current% *}
+  size=${current#* }
+  start=0
+  if [ "$saved_inode" = "$inode" ]; then
+    if [ $size -ge $offset ] && [ "$(fingerprint "$log_file" $check_size)" = "$check_sum" ]; then
+      start=$offset
+    else
+      echo "RESET truncated"
+    fi
+  elif [ "$saved_inode" != "0" ]; then
+    rotated=$(find "$(dirname "$log_file")" -maxdepth 1 -name "$(basename "$log_file").*" ! -name '*.gz' \
+              -inum $saved_inode 2>/dev/null | head -1)
+    if [ "$rotated" != "" ] && [ "$(fingerprint "$rotated" $check_size)" = "$check_sum" ]; then
+      rotated_size=$(stat -c '%s' "$rotated")
+      rotated_start=$offset
+      if [ $rotated_size -lt $offset ]; then
+        rotated_start=0
+      fi
+      name_size=$(( $(printf '%s' "$rotated" | wc -c) ))
+      send "$rotated" $rotated_start $rotated_size "ROTATED $rotated_start $rotated_size $name_size
+$rotated"
+    else
+      echo "RESET rotated"
+    fi
+  fi
+  check=$(( size < 1024 ? size : 1024 ))
+  send "$log_file" $start $size "CURRENT $inode $start $size $check $(fingerprint "$log_file" $check)
+"
+} | gzip -1
+'''
+
+
+def load_state(state_file):
+    try:
+        with open(state_file) as statef:
+            return json.load(statef)
+    except (OSError, ValueError):
+        return {}
+
+
+class CountingReader:
+    # bytes read from the ssh channel, to show what the gzip saved
+    def __init__(self, inputf):
+        self.inputf = inputf
+        self.bytes = 0
+
+    def read(self, size=-1):
+        data = self.inputf.read(size)
+        self.bytes += len(data)
+        return data
+
+
+def copy_exact(inputf, outputf, size):
+    while size > 0:
+        data = inputf.read(min(size, COPY_SIZE))
+        if not data:
+            raise EOFError("log stream ended %d bytes early" % size)
+        outputf.write(data)
+        size -= len(data)
+
+
+def fetch(user, host, log_file, archive_file, state_file):
+    states = load_state(state_file)
+    state = states.get(log_file, {"inode": "0", "offset": 0, "check_size": 0, "check_sum": "-"})
+    os.makedirs(os.path.dirname(os.path.abspath(archive_file)), exist_ok=True)
+    process = remote_ssh(user, "bash -s -- %s %s %d %d %s" % (shlex.quote(log_file), state["inode"], state["offset"],
+                                                               state["check_size"], state["check_sum"]),
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    process.stdin.write(REMOTE_SCRIPT.encode())
+    process.stdin.close()
+    received = 0
+    wire = CountingReader(process.stdout)
+    try:
+        with open(archive_file, 'ab') as archivef:
+            # bytes appended after the last saved state (an interrupted fetch) are dropped, they come again
+            if state.get("archive") == os.path.abspath(archive_file) and archivef.tell() > state["archive_size"]:
+                archivef.truncate(state["archive_size"])
+                archivef.seek(state["archive_size"])
+            with gzip.GzipFile(fileobj=wire) as streamf:
+                for header in iter(streamf.readline, b""):
+                    fields = header.decode().split()
+                    if fields[0] == "MISSING":
+                        print("%s not found on %s" % (log_file, host))
+                        return 1
+                    if fields[0] == "RESET":
+                        print("%s was %s, the bytes after offset %d are lost, reading it from the start" % (
+                            log_file, "truncated" if fields[1] == "truncated" else "rotated away", state["offset"]))
+                        continue
+                    if fields[0] == "ROTATED":
+                        start, end = int(fields[1]), int(fields[2])
+                        rotated = streamf.read(int(fields[3])).decode("utf-8", "replace")
+                    else:
+                        start, end = int(fields[2]), int(fields[3])
+                    copy_exact(streamf, archivef, end - start)
+                    received += end - start
+                    if fields[0] == "ROTATED" and start < state["offset"]:
+                        print("%s was rotated to %s, which is shorter than offset %d now, all %d bytes of it were "
+                              "read" % (log_file, rotated, state["offset"], end))
+                    elif fields[0] == "ROTATED":
+                        print("%s was rotated to %s, %d bytes of it were new" % (log_file, rotated, end - start))
+                    else:
+                        state = {"inode": fields[1], "offset": end, "check_size": int(fields[4]),
+                                 "check_sum": fields[5]}
+            archivef.flush()
+            os.fsync(archivef.fileno())
+            archive_size = archivef.tell()
+    finally:
+        # every way out waits for ssh, when the stream is left early closing it ends the remote side
+        process.stdout.close()
+        exit_code = process.wait()
+    if exit_code != 0:
+        print("fetch of %s from %s failed" % (log_file, host))
+        return 1
+    state.update(archive=os.path.abspath(archive_file), archive_size=archive_size)
+    states[log_file] = state
+    write_atomic(state_file, json.dumps(states, indent=2, sort_keys=True))
+    print("%s: %.1f KB new from %s (%.1f KB over ssh), %s is now %.1f MB" % (
+        log_file, received / 1024.0, host, wire.bytes / 1024.0, archive_file, archive_size / 2 ** 20))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="append the new part of the FSO web log to a local archive")
+    parser.add_argument("host", help="remote_ip of the FSO Machine, the fetch state is kept per host")
+    parser.add_argument("--archive", help="local archive file, default ~/.iso_plugins_automation/logs/<host>/<log>")
+    parser.add_argument("--file", default=LOG_FILE)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--reset", action="store_true", help="forget the offset, fetch the whole log again")
+    parser.add_argument("--index", action="store_true", help="add the new records to the log index (log_index.py)")
+    args = parser.parse_args()
+
+    state_file = os.path.join(STATE_DIR, args.host + ".json")
+    archive_file = args.archive or os.path.join(ARCHIVE_DIR, args.host, os.path.basename(args.file))
+    if args.reset:
+        states = load_state(state_file)
+        states.pop(args.file, None)
+        write_atomic(state_file, json.dumps(states, indent=2, sort_keys=True))
+    try:
+        exit_code = fetch(args.user, args.host, args.file, archive_file, state_file)
+    except (EOFError, OSError) as e:
+        print("fetch of %s from %s failed: %s" % (args.file, args.host, e))
+        sys.exit(1)
+    if exit_code == 0 and args.index:
+        print("%d new records in the log index" % log_index.ingest(log_index.connect(), archive_file))
+    sys.exit(exit_code)
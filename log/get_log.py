@@ -0,0 +1,159 @@
+import argparse
+import os
+import re
+import select
+import shlex
+import subprocess
+import sys
+import time
+import zlib
+
+# this file runs on both sides: locally it sends itself to the FSO Machine over ssh, where the FSO python runs it
+# with --serve, tails the log, keeps the matching lines and sends them back zlib compressed
+
+LOG_FILE = "/var/log/fireeye/fso/web/web.log"
+TIMESTAMP = re.compile(rb"^(\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d)")
+READ_SIZE = 64 * 1024
+
+
+class LineFilter:
+    # a line without a timestamp (eg. a traceback) belongs to the record above it and is kept with it,
+    # until the first timestamp is seen every line is matched on its own
+    def __init__(self, plugin=None, levels=None, pattern=None, since=None, until=None):
+        self.plugin = plugin.lower().encode() if plugin else None
+        self.levels = re.compile(rb"\b(" + b"|".join(re.escape(level.upper().encode()) for level in levels) +
+                                 rb")\b") if levels else None
+        self.pattern = re.compile(pattern.encode()) if pattern else None
+        self.since = since.replace("T", " ").encode() if since else None
+        self.until = until.replace("T", " ").encode() if until else None
+        self.keep = None
+
+    def match(self, line):
+        timestamp = TIMESTAMP.match(line)
+        if timestamp:
+            timestamp = timestamp.group(1).replace(b"T", b" ")
+            if (self.since is not None and timestamp < self.since or
+                    self.until is not None and timestamp[:len(self.until)] > self.until):
+                self.keep = False
+                return False
+        elif self.keep is not None:
+            return self.keep
+        keep = ((self.plugin is None or self.plugin in line.lower()) and
+                (self.levels is None or self.levels.search(line) is not None) and
+                (self.pattern is None or self.pattern.search(line) is not None))
+        if timestamp:
+            self.keep = keep
+        return keep
+
+
+def serve(args, line_filter):
+    # runs on the FSO Machine, matching lines are sent in batches of batch_lines lines or batch_ms
+    # milliseconds, whichever comes first, each batch is flushed so follow mode stays live
+    lines = "+1" if args.lines == "all" else args.lines
+    command = ["tail", "-n", lines] + (["-F"] if args.follow else []) + [args.file]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE)
+    fd = process.stdout.fileno()
+    compressor = zlib.compressobj(6)
+    output = sys.stdout.buffer
+    pending = b""
+    batch = []
+    batch_start = None
+    try:
+        while True:
+            timeout = None if batch_start is None else max(0, batch_start + args.batch_ms / 1000.0 - time.time())
+            if select.select([fd], [], [], timeout)[0]:
+                data = os.read(fd, READ_SIZE)
+                if not data:
+                    break
+                lines = (pending + data).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    if line_filter.match(line):
+                        batch.append(line + b"\n")
+                if batch and batch_start is None:
+                    batch_start = time.time()
+            if batch and (len(batch) >= args.batch_lines or time.time() - batch_start >= args.batch_ms / 1000.0):
+                output.write(compressor.compress(b"".join(batch)) + compressor.flush(zlib.Z_SYNC_FLUSH))
+                output.flush()
+                batch = []
+                batch_start = None
+        if pending and line_filter.match(pending):
+            batch.append(pending + b"\n")
+        output.write(compressor.compress(b"".join(batch)) + compressor.flush())
+        output.flush()
+    except BrokenPipeError:
+        pass
+    finally:
+        process.terminate()
+    return process.wait() if not args.follow else 0
+
+
+def serve_command(args):
+    serve_args = ["--serve", "--file", args.file, "--lines", args.lines, "--batch-lines", str(args.batch_lines),
+                  "--batch-ms", str(args.batch_ms)]
+    if not args.follow:
+        serve_args.append("--no-follow")
+    for option in ["plugin", "since", "until", "grep"]:
+        if getattr(args, option):
+            serve_args += ["--" + option, getattr(args, option)]
+    if args.level:
+        serve_args += ["--level", args.level]
+    return " ".join(shlex.quote(arg) for arg in serve_args)
+
+
+def fetch(args):
+    # only the local side needs the toolkit, the FSO Machine runs this file on its own
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from toolkit.remote import remote_python
+
+    with open(os.path.abspath(__file__), "rb") as sourcef:
+        source = sourcef.read()
+    process = remote_python(args.user, serve_command(args), stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    process.stdin.write(source)
+    process.stdin.close()
+    decompressor = zlib.decompressobj()
+    received = 0
+    size = 0
+    lines = 0
+    output = sys.stdout.buffer
+    try:
+        for data in iter(lambda: os.read(process.stdout.fileno(), READ_SIZE), b""):
+            received += len(data)
+            text = decompressor.decompress(data)
+            size += len(text)
+            lines += text.count(b"\n")
+            output.write(text)
+            output.flush()
+        exit_code = process.wait()
+    except KeyboardInterrupt:
+        process.terminate()
+        exit_code = 130
+    sys.stderr.write("%d lines, %.1f KB of log in %.1f KB over ssh\n" % (lines, size / 1024.0, received / 1024.0))
+    return exit_code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="tail the FSO web log, filtered on the FSO Machine")
+    parser.add_argument("--plugin", help="only lines containing the plugin name (case insensitive)")
+    parser.add_argument("--level", help="comma separated log levels, eg. ERROR,WARNING")
+    parser.add_argument("--grep", help="only lines matching this python regex")
+    parser.add_argument("--since", help="only records at or after this time, eg. '2022-07-26 18:00'")
+    parser.add_argument("--until", help="only records at or before this time")
+    parser.add_argument("--lines", help="start with the last N lines of the log or 'all', default 10 when "
+                                        "following the log and all otherwise")
+    parser.add_argument("--no-follow", dest="follow", action="store_false",
+                        help="print the matching lines and exit instead of following the log")
+    parser.add_argument("--file", default=LOG_FILE)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--batch-lines", type=int, default=500, help="lines per compressed batch")
+    parser.add_argument("--batch-ms", type=int, default=200, help="longest time a line waits for its batch")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.lines is None:
+        args.lines = "10" if args.follow else "all"
+
+    line_filter = LineFilter(args.plugin, args.level.split(",") if args.level else None, args.grep, args.since,
+                             args.until)
+    if args.serve:
+        sys.exit(serve(args, line_filter))
+    sys.exit(fetch(args))
@@ -1,2 +1,14 @@
 source $iso_plugins_automation/config/config.sh
-ssh root@$remote_ip "tail -f /var/log/fireeye/fso/web/web.log"
\ No newline at end of file
+source $iso_plugins_automation/config/remote.sh
+
+# get_log [--plugin <name>] [--level ERROR,WARNING] [--grep <regex>] [--since <time>] [--until <time>]
+#         [--lines <N|all>] [--no-follow], lines are filtered on the FSO Machine and sent compressed
+# get_log --fetch [--archive <local_file>] [--reset], only the bytes added since the last fetch from this
+#         FSO Machine are appended to the local archive
+if [ "$1" = "--fetch" ]; then
+  shift
+  python3 $iso_plugins_automation/log/fetch_log.py $remote_ip "$@"
+  exit $?
+fi
+
+python3 $iso_plugins_automation/log/get_log.py "$@"
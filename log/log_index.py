@@ -0,0 +1,233 @@
+import argparse
+import hashlib
+import mmap
+import os
+import re
+import sqlite3
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from toolkit.state import state_path  # noqa: E402
+
+INDEX_DB = state_path("log_index.sqlite")
+BATCH_SIZE = 10000
+CHECK_SIZE = 1024
+
+# a record starts with a timestamp, the lines after it without one (tracebacks) are part of the record
+RECORD_START = re.compile(rb"^(\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d(?:[,.]\d+)?)", re.M)
+LEVEL = re.compile(r"\b(DEBUG|INFO|USER_INFO|WARNING|WARN|ERROR|CRITICAL|FATAL)\b")
+PLUGIN = re.compile(r"\[([A-Za-z0-9_.\-]+)\]")
+URL = re.compile(r"request_url : (\S+)|(https?://[^\s'\",]+)")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, check_size INTEGER,
+                                  check_sum TEXT, last_record INTEGER, inode INTEGER, mtime_ns INTEGER);
+CREATE TABLE IF NOT EXISTS records (id INTEGER PRIMARY KEY, file_id INTEGER, offset INTEGER, timestamp TEXT,
+                                    plugin TEXT, level TEXT, url TEXT);
+CREATE INDEX IF NOT EXISTS records_timestamp ON records (timestamp);
+CREATE INDEX IF NOT EXISTS records_plugin ON records (plugin COLLATE NOCASE, timestamp);
+CREATE INDEX IF NOT EXISTS records_file ON records (file_id);
+CREATE INDEX IF NOT EXISTS records_level ON records (level);
+CREATE INDEX IF NOT EXISTS records_url ON records (url);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5 (message);
+"""
+
+
+def connect(db_file=INDEX_DB):
+    os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    # indexes made before files had inode and mtime_ns
+    columns = [column[1] for column in conn.execute("PRAGMA table_info(files)")]
+    for column in ["inode", "mtime_ns"]:
+        if column not in columns:
+            conn.execute("ALTER TABLE files ADD COLUMN %s INTEGER" % column)
+    return conn
+
+
+def parse_record(offset, timestamp, text):
+    first_line = text.split("\n", 1)[0]
+    level = LEVEL.search(first_line)
+    plugin = PLUGIN.search(first_line)
+    url = URL.search(first_line)
+    return (offset, timestamp.replace("T", " ") if timestamp else None, plugin.group(1) if plugin else None,
+            level.group(1) if level else None, (url.group(1) or url.group(2)) if url else None)
+
+
+def forget(conn, file_id):
+    conn.execute("DELETE FROM messages WHERE rowid IN (SELECT id FROM records WHERE file_id = ?)", (file_id,))
+    conn.execute("DELETE FROM records WHERE file_id = ?", (file_id,))
+
+
+def record_spans(data, start, end):
+    # (offset, timestamp, end offset) of the records starting in data[start:end], found one at a time
+    previous = None
+    for match in RECORD_START.finditer(data, start, end):
+        if previous is not None:
+            yield previous[0], previous[1], match.start()
+        previous = (match.start(), match.group(1).decode())
+    if previous is not None:
+        yield previous[0], previous[1], end
+
+
+def ingest(conn, log_file):
+    # only the part of the file after the last ingest is read, through mmap and BATCH_SIZE records at a time
+    # so the file is never loaded into memory; a file that was replaced (inode), shrank, was rewritten in
+    # place (same size, new mtime) or whose first KB changed is indexed again from the start
+    # returns the number of records added or extended
+    path = os.path.abspath(log_file)
+    stat = os.stat(path)
+    row = conn.execute("SELECT id, size, check_size, check_sum, last_record, inode, mtime_ns FROM files "
+                       "WHERE path = ?", (path,)).fetchone()
+    if stat.st_size == 0 or (row and (row[1], row[5], row[6]) == (stat.st_size, stat.st_ino, stat.st_mtime_ns)):
+        return 0
+    count = 0
+    with open(path, "rb") as logf, conn:
+        with mmap.mmap(logf.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = len(data)
+            if row is None:
+                file_id = conn.execute("INSERT INTO files (path, size, check_size, check_sum) VALUES (?, 0, 0, '')",
+                                       (path,)).lastrowid
+                start, last_record = 0, None
+            else:
+                file_id, start, last_record = row[0], row[1], row[4]
+                if (row[5] not in (None, stat.st_ino) or size < row[1] or
+                        (size == row[1] and row[6] is not None and row[6] != stat.st_mtime_ns) or
+                        hashlib.md5(data[:row[2]]).hexdigest() != row[3]):
+                    forget(conn, file_id)
+                    start, last_record = 0, None
+            # a line still being written is left for the next ingest
+            end = data.rfind(b"\n", start, size) + 1
+            if end > start:
+                next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM records").fetchone()[0]
+                first = RECORD_START.search(data, start, end)
+                records = []
+                messages = []
+                if first is None or first.start() > start:
+                    # lines continuing the last record of the previous ingest
+                    text = data[start:first.start() if first else end].decode("utf-8", "replace")
+                    if last_record is not None:
+                        conn.execute("UPDATE messages SET message = message || ? WHERE rowid = ?",
+                                     ("\n" + text.rstrip("\n"), last_record))
+                    else:
+                        records.append((next_id, file_id) + parse_record(start, None, text))
+                        messages.append((next_id, text.rstrip("\n")))
+                        last_record = next_id
+                        next_id += 1
+                    count += 1
+                for offset, timestamp, record_end in record_spans(data, first.start() if first else end, end):
+                    text = data[offset:record_end].decode("utf-8", "replace")
+                    records.append((next_id, file_id) + parse_record(offset, timestamp, text))
+                    messages.append((next_id, text.rstrip("\n")))
+                    last_record = next_id
+                    next_id += 1
+                    count += 1
+                    if len(records) >= BATCH_SIZE:
+                        conn.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+                        conn.executemany("INSERT INTO messages (rowid, message) VALUES (?, ?)", messages)
+                        records, messages = [], []
+                conn.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+                conn.executemany("INSERT INTO messages (rowid, message) VALUES (?, ?)", messages)
+            end = max(end, start)
+            check_size = min(CHECK_SIZE, end)
+            conn.execute("UPDATE files SET size = ?, check_size = ?, check_sum = ?, last_record = ?, inode = ?, "
+                         "mtime_ns = ? WHERE id = ?", (end, check_size, hashlib.md5(data[:check_size]).hexdigest(),
+                                                       last_record, stat.st_ino, stat.st_mtime_ns, file_id))
+    return count
+
+
+def fts_query(text):
+    # every word must appear, words are quoted so dots and slashes (microsoft.teams) need no FTS5 syntax
+    return " ".join('"%s"' % word.replace('"', '""') for word in text.split())
+
+
+def search(conn, text=None, plugin=None, levels=None, since=None, until=None, url=None, limit=50, raw=False):
+    # the last <limit> matching records, oldest first
+    # the filters use the records indexes, messages is only searched (MATCH) for text and only read for the
+    # records returned
+    conditions = []
+    params = []
+    if plugin:
+        conditions.append("records.plugin = ? COLLATE NOCASE")
+        params.append(plugin)
+    if levels:
+        conditions.append("records.level IN (%s)" % ",".join("?" * len(levels)))
+        params += [level.upper() for level in levels]
+    if since:
+        conditions.append("records.timestamp >= ?")
+        params.append(since.replace("T", " "))
+    if until:
+        conditions.append("records.timestamp <= ?")
+        params.append(until.replace("T", " ") + "\uffff")
+    if url and "://" in url:
+        # a url prefix, a range of the records_url index
+        conditions.append("records.url >= ? AND records.url < ?")
+        params += [url, url + "\uffff"]
+    elif url:
+        conditions.append("records.url LIKE ?")
+        params.append("%" + url + "%")
+    if text:
+        query = ("SELECT records.id, records.file_id, records.offset FROM messages "
+                 "JOIN records ON records.id = messages.rowid WHERE messages MATCH ?")
+        params.insert(0, text if raw else fts_query(text))
+        order = "messages.rowid DESC"
+    else:
+        query = "SELECT records.id, records.file_id, records.offset FROM records WHERE 1"
+        # in the order of the records_plugin and records_timestamp indexes, so the last rows are read
+        # from the index without sorting every match
+        order = "records.timestamp DESC, records.id DESC" if plugin or since or until else "records.id DESC"
+    for condition in conditions:
+        query += " AND " + condition
+    rows = conn.execute(query + " ORDER BY %s LIMIT ?" % order, params + [limit]).fetchall()[::-1]
+    paths = dict(conn.execute("SELECT id, path FROM files"))
+    messages = dict(conn.execute("SELECT rowid, message FROM messages WHERE rowid IN (%s)" % ",".join(
+        str(row[0]) for row in rows))) if rows else {}
+    return [(record_id, paths.get(file_id), offset, messages.get(record_id, "")) for record_id, file_id, offset in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="full-text index of collected FSO web logs")
+    parser.add_argument("--db", default=INDEX_DB)
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    add_parser = subparsers.add_parser("add", help="index the new part of log files")
+    add_parser.add_argument("log_files", nargs="+")
+    search_parser = subparsers.add_parser("search", help="records matching every word of text and the filters")
+    search_parser.add_argument("text", nargs="*")
+    search_parser.add_argument("--plugin")
+    search_parser.add_argument("--level", help="comma separated log levels, eg. ERROR,WARNING")
+    search_parser.add_argument("--since", help="eg. '2022-07-26 18:00'")
+    search_parser.add_argument("--until")
+    search_parser.add_argument("--url", help="request url containing this")
+    search_parser.add_argument("--limit", type=int, default=50)
+    search_parser.add_argument("--fts", action="store_true", help="text is an FTS5 query (AND, OR, NOT, prefix*)")
+    search_parser.add_argument("--location", action="store_true", help="print <file>:<offset> before each record")
+    subparsers.add_parser("stats", help="indexed files and records")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.action == "add":
+        for log_file in args.log_files:
+            start = time.perf_counter()
+            count = ingest(conn, log_file)
+            print("%s: %d new records in %.1fs" % (log_file, count, time.perf_counter() - start))
+    elif args.action == "search":
+        start = time.perf_counter()
+        try:
+            rows = search(conn, " ".join(args.text), args.plugin, args.level.split(",") if args.level else None,
+                          args.since, args.until, args.url, args.limit, args.fts)
+        except sqlite3.OperationalError as e:
+            print("bad query: %s" % e)
+            sys.exit(2)
+        elapsed = time.perf_counter() - start
+        for record_id, path, offset, message in rows:
+            print(("%s:%d: " % (path, offset) if args.location else "") + message)
+        sys.stderr.write("%d records in %.1f ms\n" % (len(rows), elapsed * 1000))
+    else:
+        for path, size in conn.execute("SELECT path, size FROM files ORDER BY path"):
+            print("%-60s %10.1f MB" % (path, size / 2 ** 20))
+        count, first, last = conn.execute("SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM records").fetchone()
+        print("%d records from %s to %s, index %.1f MB" % (count, first, last, os.path.getsize(args.db) / 2 ** 20))
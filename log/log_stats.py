@@ -0,0 +1,216 @@
+import argparse
+import calendar
+import gzip
+import json
+import math
+import os
+import re
+import sys
+import time
+
+TOOLKIT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(TOOLKIT_DIR, "log"))
+
+from log_index import PLUGIN, RECORD_START  # noqa: E402
+
+# status_code : 200, request_url : https://graph.microsoft.com/v1.0/teams/..[, ..., elapsed_ms : 123]
+REQUEST = re.compile(r"status_code : (\d+|failed), request_url : (\S+?),?(?:\s|$)")
+FAILED_REQUEST = re.compile(r"Failed to make request to url : (\S+?)\.?(?:\s|$)")
+ELAPSED = re.compile(r"elapsed_ms : (\d+(?:\.\d+)?)")
+TASK = re.compile(r"Running (\w+) [Tt]ask")
+# path segments that are ids: numbers, uuids, long hex/base64 strings, 19:...@thread.tacv2 chat ids
+ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F-]{16,}|[A-Za-z0-9+=_-]{24,}|\d+:.*|.*@.*|\{.*\})$")
+API_VERSION = re.compile(r"^(v\d+(\.\d+)?|beta|api)$")
+GAMMA = 1.05
+
+
+class LatencyHistogram:
+    # log-scale buckets, percentiles within GAMMA - 1 (5%) of the real value whatever the number of requests
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        index = int(math.ceil(math.log(value, GAMMA))) if value >= 1 else 0
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(GAMMA ** index, self.max) if index else min(1.0, self.max)
+        return self.max
+
+
+class EndpointStats:
+    def __init__(self):
+        self.statuses = {}
+        self.errors = 0
+        self.latency = LatencyHistogram()
+        self.derived = 0
+
+    def add(self, status, elapsed_ms, derived):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == "failed" or status.isdigit() and int(status) >= 400:
+            self.errors += 1
+        if elapsed_ms is not None:
+            self.latency.add(elapsed_ms)
+            self.derived += 1 if derived else 0
+
+    def count(self):
+        return sum(self.statuses.values())
+
+
+def endpoint(url):
+    # https://graph.microsoft.com/v1.0/teams/<id>/channels?$filter=.. -> /teams/{id}/channels
+    path = url.split("?", 1)[0]
+    if "://" in path:
+        path = "/" + path.split("://", 1)[1].partition("/")[2]
+    segments = [segment for segment in path.split("/") if segment]
+    if segments and API_VERSION.match(segments[0]):
+        segments = segments[1:]
+    return "/" + "/".join("{id}" if ID_SEGMENT.match(segment) or "(" in segment else segment
+                          for segment in segments)
+
+
+class LogStats:
+    # one pass over the log lines, memory only grows with the number of distinct plugin/endpoint/status
+    def __init__(self, by_status=False):
+        self.by_status = by_status
+        self.endpoints = {}
+        self.last_seen = {}
+        self.open_tasks = {}
+        # plugin -> url of its last request line written by a plugin that also logs failed requests that way
+        self.failed_logged = {}
+        self.epochs = {}
+        self.lines = 0
+
+    def timestamp(self, text):
+        # "YYYY-MM-DD HH:MM:SS[,mmm]" -> epoch seconds, strptime once per distinct second
+        seconds = self.epochs.get(text[:19])
+        if seconds is None:
+            if len(self.epochs) > 100000:
+                self.epochs.clear()
+            seconds = calendar.timegm(time.strptime(text[:19].replace("T", " "), "%Y-%m-%d %H:%M:%S"))
+            self.epochs[text[:19]] = seconds
+        return seconds + (float("0." + text[20:]) if len(text) > 20 else 0.0)
+
+    def record(self, plugin, name, status, elapsed_ms, derived):
+        key = (plugin, name, status if self.by_status else "")
+        stats = self.endpoints.get(key)
+        if stats is None:
+            stats = self.endpoints[key] = EndpointStats()
+        stats.add(status, elapsed_ms, derived)
+
+    def add_line(self, line):
+        self.lines += 1
+        start = RECORD_START.match(line)
+        if not start:
+            return
+        text = line.decode("utf-8", "replace")
+        now = self.timestamp(start.group(1).decode())
+        plugin = PLUGIN.search(text)
+        plugin = plugin.group(1) if plugin else "-"
+        request = REQUEST.search(text) if b"request_url" in line else None
+        failed = FAILED_REQUEST.search(text) if request is None and b"Failed to make request" in line else None
+        if failed and self.failed_logged.pop(plugin, None) == failed.group(1):
+            # the request line of this failure (status_code : <code> or failed) was already counted
+            failed = None
+        if request or failed:
+            elapsed = ELAPSED.search(text)
+            previous = self.last_seen.get(plugin)
+            if elapsed:
+                elapsed_ms, derived = float(elapsed.group(1)), False
+            else:
+                # the request line is written when the response came back, the line before it of the same
+                # plugin is the closest thing to the start of the request
+                elapsed_ms, derived = ((now - previous) * 1000 if previous is not None else None), True
+            if request:
+                self.record(plugin, endpoint(request.group(2)), request.group(1), elapsed_ms, derived)
+                if "client_request_id" in text:
+                    self.failed_logged[plugin] = request.group(2)
+                else:
+                    self.failed_logged.pop(plugin, None)
+            else:
+                self.record(plugin, endpoint(failed.group(1)), "failed", elapsed_ms, derived)
+        elif b"unning" in line:
+            task = TASK.search(text)
+            if task:
+                # an ETP task runs until the next task of the plugin starts
+                self.close_task(plugin)
+                self.open_tasks[plugin] = (task.group(1), now)
+        self.last_seen[plugin] = now
+
+    def close_task(self, plugin):
+        if plugin in self.open_tasks:
+            name, started = self.open_tasks.pop(plugin)
+            self.record(plugin, "task:" + name, "-", (self.last_seen[plugin] - started) * 1000, True)
+
+    def finish(self):
+        for plugin in list(self.open_tasks):
+            self.close_task(plugin)
+
+    def rows(self):
+        rows = []
+        for (plugin, name, status), stats in self.endpoints.items():
+            latency = stats.latency
+            rows.append({"plugin": plugin, "endpoint": name, "status": status or " ".join(
+                "%s:%d" % item for item in sorted(stats.statuses.items()) if item[0] != "-"), "count": stats.count(),
+                "error_rate": stats.errors / float(stats.count()), "p50_ms": latency.percentile(0.5),
+                "p90_ms": latency.percentile(0.9), "p99_ms": latency.percentile(0.99),
+                "max_ms": latency.max if latency.count else None, "total_s": latency.total / 1000,
+                "derived": stats.derived == latency.count and latency.count > 0})
+        return sorted(rows, key=lambda row: (-row["total_s"], -row["count"]))
+
+
+def open_log(path):
+    if path == "-":
+        return sys.stdin.buffer
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def format_ms(value):
+    return "-" if value is None else "%.0f" % value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="request counts, error rates and latency percentiles per plugin "
+                                                 "and endpoint from FSO web logs")
+    parser.add_argument("log_files", nargs="+", help="web.log files, .gz files or - for stdin")
+    parser.add_argument("--plugin", help="only this plugin")
+    parser.add_argument("--by-status", action="store_true", help="one row per status code")
+    parser.add_argument("--top", type=int, default=0, help="only the endpoints with the most total time")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = LogStats(args.by_status)
+    for log_file in args.log_files:
+        with open_log(log_file) as logf:
+            for line in logf:
+                stats.add_line(line)
+    stats.finish()
+    rows = [row for row in stats.rows() if not args.plugin or row["plugin"].lower() == args.plugin.lower()]
+    if args.top:
+        rows = rows[:args.top]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        sys.exit(0)
+    print("%-20s %-40s %7s %6s %8s %8s %8s %8s %9s  %s" % (
+        "plugin", "endpoint", "count", "err%", "p50(ms)", "p90(ms)", "p99(ms)", "max(ms)", "total(s)", "status"))
+    for row in rows:
+        print("%-20s %-40s %7d %6.1f %8s %8s %8s %8s %8.1f%s  %s" % (
+            row["plugin"], row["endpoint"], row["count"], row["error_rate"] * 100, format_ms(row["p50_ms"]),
+            format_ms(row["p90_ms"]), format_ms(row["p99_ms"]), format_ms(row["max_ms"]), row["total_s"],
+            "*" if row["derived"] else " ", row["status"]))
+    sys.stderr.write("%d lines in %.1fs, * latency derived from the time since the plugin's previous log line\n" % (
+        stats.lines, time.perf_counter() - start))
@@ -0,0 +1,221 @@
+import argparse
+import calendar
+import os
+import re
+import sys
+import time
+
+TOOLKIT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(TOOLKIT_DIR, "log"))
+
+from log_index import INDEX_DB, connect, fts_query, ingest  # noqa: E402
+from log_stats import REQUEST, endpoint  # noqa: E402
+
+# a command invocation starts at "<command> command started" (microsoft teams) or "Running <task> Task" (ETP)
+INVOCATION_START = re.compile(r"(\w+) command started|Running (\w+) [Tt]ask")
+INVOCATION_QUERY = '"command started" OR (running AND task)'
+FIELD = re.compile(r"(method|client_request_id|attempt|elapsed_ms) : ([^,\s]+)")
+MAX_RECORDS = 100000
+
+
+def epoch(timestamp):
+    seconds = calendar.timegm(time.strptime(timestamp[:19], "%Y-%m-%d %H:%M:%S"))
+    return seconds + (float("0." + timestamp[20:]) if len(timestamp) > 20 else 0.0)
+
+
+def invocation_name(message):
+    start = INVOCATION_START.search(message.split("\n", 1)[0])
+    return (start.group(1) or start.group(2)) if start else None
+
+
+def invocation_starts(conn, plugin, before=None, after=None, limit=1):
+    # start records of plugin's invocations, newest first before record id <before>, oldest first after <after>
+    query = ("SELECT records.id, messages.message FROM messages JOIN records ON records.id = messages.rowid "
+             "WHERE messages MATCH ? AND records.plugin IS ?")
+    params = [INVOCATION_QUERY, plugin]
+    if before is not None:
+        query += " AND messages.rowid <= ? ORDER BY messages.rowid DESC"
+        params.append(before)
+    else:
+        query += " AND messages.rowid > ? ORDER BY messages.rowid"
+        params.append(after)
+    starts = []
+    for record_id, message in conn.execute(query, params):
+        name = invocation_name(message)
+        if name:
+            starts.append((record_id, name))
+            if len(starts) == limit:
+                break
+    return starts
+
+
+def load_invocation(conn, start_id, name, plugin, gap):
+    # records of the plugin from the start record to the next invocation start, or to the first pause longer
+    # than <gap> seconds when no other invocation follows
+    file_id, = conn.execute("SELECT file_id FROM records WHERE id = ?", (start_id,)).fetchone()
+    following = invocation_starts(conn, plugin, after=start_id)
+    end_id = following[0][0] if following else start_id + MAX_RECORDS
+    records = []
+    previous = None
+    for record_id, timestamp, message in conn.execute(
+            "SELECT records.id, records.timestamp, messages.message FROM records JOIN messages "
+            "ON messages.rowid = records.id WHERE records.id >= ? AND records.id < ? AND records.file_id = ? "
+            "AND records.plugin IS ? ORDER BY records.id", (start_id, end_id, file_id, plugin)):
+        if timestamp is None:
+            continue
+        now = epoch(timestamp)
+        if not following and previous is not None and now - previous > gap:
+            break
+        records.append((record_id, timestamp, now, message))
+        previous = now
+    return build_tree(name, plugin, records)
+
+
+def build_tree(name, plugin, records):
+    # invocation -> requests, one per client_request_id (or per line for lines without one) -> attempts
+    invocation = {"name": name, "plugin": plugin, "start": records[0][2], "timestamp": records[0][1],
+                  "end": records[-1][2], "requests": []}
+    requests = {}
+    for record_id, timestamp, now, message in records:
+        first_line = message.split("\n", 1)[0]
+        request = REQUEST.search(first_line)
+        if not request:
+            continue
+        fields = dict(FIELD.findall(first_line))
+        elapsed = float(fields["elapsed_ms"]) / 1000 if "elapsed_ms" in fields else 0.0
+        attempt = {"attempt": int(fields.get("attempt", 1)), "status": request.group(1), "end": now,
+                   "start": now - elapsed, "elapsed": elapsed, "record_id": record_id}
+        request_id = fields.get("client_request_id") or "line-%d" % record_id
+        node = requests.get(request_id)
+        if node is None:
+            node = requests[request_id] = {"request_id": fields.get("client_request_id", "-"),
+                                           "method": fields.get("method", ""), "url": request.group(2),
+                                           "attempts": []}
+            invocation["requests"].append(node)
+        node["attempts"].append(attempt)
+    for node in invocation["requests"]:
+        node["start"] = min(attempt["start"] for attempt in node["attempts"])
+        node["end"] = max(attempt["end"] for attempt in node["attempts"])
+        node["in_requests"] = sum(attempt["elapsed"] for attempt in node["attempts"])
+        node["status"] = node["attempts"][-1]["status"]
+    invocation["start"] = min([invocation["start"]] + [node["start"] for node in invocation["requests"]])
+    return invocation
+
+
+def print_tree(invocation, highlight=None):
+    start = invocation["start"]
+    duration = invocation["end"] - start
+    in_requests = sum(node["in_requests"] for node in invocation["requests"])
+    print("%s [%s] %s  %.2fs, %d requests %.2fs, %.2fs outside requests" % (
+        invocation["name"], invocation["plugin"], invocation["timestamp"], duration, len(invocation["requests"]),
+        in_requests, duration - in_requests))
+    for number, node in enumerate(invocation["requests"]):
+        last = number == len(invocation["requests"]) - 1
+        attempts = node["attempts"]
+        print("%s +%7.2fs %-6s %-40s %-6s %8.0fms %s%s%s" % (
+            "└─" if last else "├─", node["start"] - start, node["method"], endpoint(node["url"]), node["status"],
+            node["in_requests"] * 1000, node["request_id"],
+            "  %d attempts over %.2fs" % (len(attempts), node["end"] - node["start"]) if len(attempts) > 1 else "",
+            "  <==" if highlight and node["request_id"] == highlight else ""))
+        if len(attempts) > 1:
+            for attempt in attempts:
+                print("%s   attempt %-2d +%7.2fs %-6s %8.0fms" % (
+                    "  " if last else "│ ", attempt["attempt"], attempt["start"] - start, attempt["status"],
+                    attempt["elapsed"] * 1000))
+
+
+def slowest_starts(conn, command, plugin, since=None, until=None, limit=5):
+    # the <limit> longest invocations of command ranked in SQL, the span of an invocation is its start record to
+    # the last record of the plugin in the same file before the next invocation start; only the invocation
+    # after the last start is open ended (load_invocation cuts it at the first gap), it is returned apart
+    # returns (ranked start ids, id of the last start when it is one of command, number of starts of command)
+    conn.create_function("invocation_name", 1, invocation_name, deterministic=True)
+    conn.create_function("epoch", 1, lambda timestamp: epoch(timestamp) if timestamp else None, deterministic=True)
+    conditions = ["name = ?"]
+    params = [INVOCATION_QUERY, plugin, plugin, command]
+    if since:
+        conditions.append("timestamp >= ?")
+        params.append(since.replace("T", " "))
+    if until:
+        conditions.append("timestamp <= ?")
+        params.append(until.replace("T", " ") + "\uffff")
+    rows = conn.execute(
+        "WITH starts AS (SELECT id, file_id, timestamp, name, LEAD(id) OVER (ORDER BY id) AS next_id FROM "
+        "(SELECT records.id, records.file_id, records.timestamp, invocation_name(messages.message) AS name "
+        "FROM messages JOIN records ON records.id = messages.rowid WHERE messages MATCH ? AND records.plugin IS ?) "
+        "WHERE name IS NOT NULL), "
+        "spans AS (SELECT id, next_id, epoch((SELECT MAX(records.timestamp) FROM records WHERE records.id >= starts.id "
+        "AND records.id < starts.next_id AND records.file_id = starts.file_id AND records.plugin IS ?)) - "
+        "epoch(timestamp) AS span, COUNT(*) OVER () AS total FROM starts WHERE " + " AND ".join(conditions) + ") "
+        "SELECT id, next_id, total FROM spans ORDER BY next_id IS NULL DESC, span DESC LIMIT ?",
+        params + [limit + 1]).fetchall()
+    last = [record_id for record_id, next_id, total in rows if next_id is None]
+    ranked = [record_id for record_id, next_id, total in rows if next_id is not None][:limit]
+    return ranked, last[0] if last else None, rows[0][2] if rows else 0
+
+
+def find_request(conn, request_id):
+    row = conn.execute("SELECT records.id, records.plugin FROM messages JOIN records ON records.id = messages.rowid "
+                       "WHERE messages MATCH ? ORDER BY messages.rowid LIMIT 1", (fts_query(request_id),)).fetchone()
+    if row is None:
+        return None
+    starts = invocation_starts(conn, row[1], before=row[0])
+    if not starts:
+        return None
+    return starts[0] + (row[1],)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="span trees of plugin command invocations, their requests and the "
+                                                 "retries of each request, from the log index (log_index.py)")
+    parser.add_argument("request_id", nargs="?", help="client_request_id, show the invocation that sent it")
+    parser.add_argument("--db", default=INDEX_DB)
+    parser.add_argument("--add", action="append", metavar="LOG_FILE", help="index this log file first")
+    parser.add_argument("--command", help="invocations of this command, eg. createTeam")
+    parser.add_argument("--plugin", default="microsoft.teams")
+    parser.add_argument("--since", help="eg. '2022-07-26 18:00'")
+    parser.add_argument("--until")
+    parser.add_argument("--limit", type=int, default=5, help="number of invocations, the latest ones")
+    parser.add_argument("--slowest", action="store_true", help="the slowest invocations instead of the latest")
+    parser.add_argument("--gap", type=float, default=60,
+                        help="seconds of silence that end the last invocation in the log")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    for log_file in args.add or []:
+        ingest(conn, log_file)
+    begin = time.perf_counter()
+    if args.request_id:
+        found = find_request(conn, args.request_id)
+        if found is None:
+            print("no invocation found for request %s in %s" % (args.request_id, args.db))
+            sys.exit(1)
+        print_tree(load_invocation(conn, found[0], found[1], found[2], args.gap), args.request_id)
+    elif args.command and args.slowest:
+        ranked, last, total = slowest_starts(conn, args.command, args.plugin, args.since, args.until, args.limit)
+        invocations = [load_invocation(conn, record_id, args.command, args.plugin, args.gap)
+                       for record_id in ranked + ([last] if last is not None else [])]
+        invocations = sorted(invocations, key=lambda invocation: invocation["start"] - invocation["end"])[:args.limit]
+        for invocation in invocations:
+            print_tree(invocation)
+            print("")
+        sys.stderr.write("%d slowest of %d invocations of %s\n" % (len(invocations), total, args.command))
+    elif args.command:
+        query = ("SELECT records.id, records.plugin, messages.message FROM messages JOIN records "
+                 "ON records.id = messages.rowid WHERE messages MATCH ? AND records.plugin IS ?")
+        params = ['"%s" AND (%s)' % (args.command, INVOCATION_QUERY), args.plugin]
+        if args.since:
+            query += " AND records.timestamp >= ?"
+            params.append(args.since.replace("T", " "))
+        if args.until:
+            query += " AND records.timestamp <= ?"
+            params.append(args.until.replace("T", " ") + "\uffff")
+        starts = [(record_id, plugin) for record_id, plugin, message in conn.execute(
+            query + " ORDER BY messages.rowid DESC", params) if invocation_name(message) == args.command]
+        for record_id, plugin in starts[:args.limit]:
+            print_tree(load_invocation(conn, record_id, args.command, plugin, args.gap))
+            print("")
+        sys.stderr.write("%d of %d invocations of %s\n" % (min(args.limit, len(starts)), len(starts), args.command))
+    else:
+        parser.error("give a request_id or --command")
+    sys.stderr.write("%.1f ms\n" % ((time.perf_counter() - begin) * 1000))
@@ -1,3 +1,4 @@
 source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
 
-rsync -r $user@$remote_ip:$1 $2
\ No newline at end of file
+remote_rsync $user -r $user@$remote_ip:$1 $2
\ No newline at end of file
@@ -1,4 +1,5 @@
 source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
 user="ixoperator"
 
 if [ "$1" == "" ]; then
@@ -13,4 +14,4 @@ else
   password=$2
 fi
 
-ssh $user@$remote_ip "cd /opt/fireeye/fso &&  bin/fso reset password -u $fso_user --password $password --no-check"
\ No newline at end of file
+remote_ssh $user "cd /opt/fireeye/fso &&  bin/fso reset password -u $fso_user --password $password --no-check"
\ No newline at end of file
@@ -0,0 +1,114 @@
+import argparse
+import gzip
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+TOOLKIT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(TOOLKIT_DIR, "snapshot"))
+
+from snapshot_store import SnapshotStore  # noqa: E402
+
+
+def make_snapshots(output_dir, count, size_mb, edits, seed):
+    # a base snapshot of table rows plus some incompressible blobs, every next snapshot is the previous one
+    # with rows inserted, deleted and changed at random places, like snapshots of one FSO taken days apart
+    rng = random.Random(seed)
+    rows = []
+    total = 0
+    while total < size_mb * 2 ** 20 * 0.8:
+        row = ("INSERT INTO events VALUES(%d,'host%d','%s',%.6f);\n" % (
+            len(rows), rng.randrange(64), "x" * rng.randrange(40), rng.random())).encode()
+        rows.append(row)
+        total += len(row)
+    data = bytearray(b"".join(rows) + rng.randbytes(size_mb * 2 ** 20 - total))
+    paths = []
+    for number in range(count):
+        if number:
+            for _ in range(edits):
+                position = rng.randrange(len(data))
+                action = rng.randrange(3)
+                if action == 0:
+                    data[position:position] = rng.randbytes(rng.randrange(1, 512))
+                elif action == 1:
+                    del data[position:position + rng.randrange(1, 4096)]
+                else:
+                    data[position:position + 64] = rng.randbytes(64)
+        path = os.path.join(output_dir, "fso_snapshot_%02d" % number)
+        with open(path, "wb") as outputf:
+            outputf.write(data)
+        paths.append(path)
+    return paths
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, dirs, files in os.walk(path) for name in files)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def gzip_file(path, output_file):
+    with open(path, "rb") as inputf, gzip.open(output_file, "wb", compresslevel=1) as outputf:
+        shutil.copyfileobj(inputf, outputf, 2 ** 20)
+
+
+def gunzip_file(path, output_file):
+    with gzip.open(path, "rb") as inputf, open(output_file, "wb") as outputf:
+        shutil.copyfileobj(inputf, outputf, 2 ** 20)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="storage and restore time of the snapshot store against "
+                                                 "plain and gzipped snapshot files")
+    parser.add_argument("--snapshots", type=int, default=5)
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--edits", type=int, default=50, help="edits between two consecutive snapshots")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("files", nargs="*", help="real snapshot files to use instead of synthetic ones")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="benchmark_store.")
+    try:
+        if args.files:
+            paths = args.files
+        else:
+            os.makedirs(os.path.join(work_dir, "snapshots"))
+            paths = make_snapshots(os.path.join(work_dir, "snapshots"), args.snapshots, args.size_mb, args.edits,
+                                   args.seed)
+        logical = sum(os.path.getsize(path) for path in paths)
+        restored = os.path.join(work_dir, "restored")
+        results = []
+
+        plain_dir = os.path.join(work_dir, "plain")
+        os.makedirs(plain_dir)
+        store_time = sum(timed(shutil.copyfile, path, os.path.join(plain_dir, os.path.basename(path)))
+                         for path in paths)
+        restore_time = timed(shutil.copyfile, os.path.join(plain_dir, os.path.basename(paths[-1])), restored)
+        results.append(("plain files", dir_size(plain_dir), store_time, restore_time))
+
+        gzip_dir = os.path.join(work_dir, "gzip")
+        os.makedirs(gzip_dir)
+        store_time = sum(timed(gzip_file, path, os.path.join(gzip_dir, os.path.basename(path) + ".gz"))
+                         for path in paths)
+        restore_time = timed(gunzip_file, os.path.join(gzip_dir, os.path.basename(paths[-1]) + ".gz"), restored)
+        results.append(("gzip -1 files", dir_size(gzip_dir), store_time, restore_time))
+
+        store = SnapshotStore(os.path.join(work_dir, "store"))
+        store_time = sum(timed(store.put, path) for path in paths)
+        restore_time = timed(store.get_file, os.path.basename(paths[-1]), restored)
+        results.append(("snapshot store", store.stored_bytes(), store_time, restore_time))
+
+        print("%d snapshots, %.1f MB" % (len(paths), logical / 2 ** 20))
+        print("%-16s %12s %8s %12s %14s" % ("storage", "stored MB", "ratio", "store MB/s", "restore last(s)"))
+        for name, stored, store_time, restore_time in results:
+            print("%-16s %12.1f %7.1fx %12.1f %14.2f" % (name, stored / 2 ** 20, logical / max(stored, 1),
+                                                         logical / 2 ** 20 / max(store_time, 1e-6), restore_time))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
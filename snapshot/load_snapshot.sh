@@ -1,8 +1,42 @@
 source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
 
+# load_snapshot <snapshot_file | name in the snapshot store> [--stream]
 snapshot_file=$1
 
-rsync $snapshot_file $user@$remote_ip:/opt/fireeye/fso/snapshot/
+if [ ! -f "$snapshot_file" ] && python3 $iso_plugins_automation/snapshot/snapshot_store.py has "$snapshot_file"; then
+  # reassembled from the local snapshot store into a temp dir, then loaded like any snapshot file
+  store_dir=$(mktemp -d)
+  trap 'rm -rf "$store_dir"' EXIT
+  python3 $iso_plugins_automation/snapshot/snapshot_store.py get "$snapshot_file" "$store_dir/$snapshot_file" || exit 1
+  snapshot_file=$store_dir/$snapshot_file
+fi
+
+if [ "$2" = "--stream" ] || [ "${snapshot_file%.gz}" != "$snapshot_file" ]; then
+  # the local file is read by fso snapshot load straight from the ssh channel (fd 3), nothing is stored on
+  # the FSO Machine, snapshots saved with --compress are unpacked on the way
+  remote_command="cd /opt/fireeye/fso && bin/fso snapshot load /dev/fd/3 3<&0 </dev/null"
+  if [ "${snapshot_file%.gz}" != "$snapshot_file" ]; then
+    remote_command="cd /opt/fireeye/fso && gunzip -c | bin/fso snapshot load /dev/fd/3 3<&0 </dev/null"
+  fi
+  python3 $iso_plugins_automation/snapshot/snapshot_stream.py load ixoperator $snapshot_file "$remote_command"
+  stream_status=$?
+  if [ $stream_status -ne 75 ]; then
+    exit $stream_status
+  fi
+  # 75: this fso cannot read its snapshot from a pipe (it seeks in the file), the snapshot is then copied to
+  # the FSO Machine and loaded from there, a .gz snapshot is unpacked locally first
+  echo "fso cannot stream the snapshot, copying the snapshot to the FSO Machine instead"
+  if [ "${snapshot_file%.gz}" != "$snapshot_file" ]; then
+    unpack_dir=$(mktemp -d)
+    trap 'rm -rf "$store_dir" "$unpack_dir"' EXIT
+    unpacked_file=${snapshot_file##*/}
+    gunzip -c $snapshot_file > $unpack_dir/${unpacked_file%.gz} || exit 1
+    snapshot_file=$unpack_dir/${unpacked_file%.gz}
+  fi
+fi
+
+remote_rsync $user $snapshot_file $user@$remote_ip:/opt/fireeye/fso/snapshot/
 user="ixoperator"
 snapshot_file_name_last="${snapshot_file##*/}"
-ssh $user@$remote_ip "cd /opt/fireeye/fso &&  bin/fso snapshot load snapshot/$snapshot_file_name_last"
\ No newline at end of file
+remote_ssh $user "cd /opt/fireeye/fso &&  bin/fso snapshot load snapshot/$snapshot_file_name_last"
@@ -1,19 +1,78 @@
 source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
 user="ixoperator"
 
+# save_snapshot <snapshot_name> [--include-encrypted] [<local_path>] [--stream] [--compress] [--store]
 snapshot_file_name=$1
+shift
 snapshot_local_path='.' # default to current dir
-if [ "$2" == "--include-encrypted" ]; then
-  ssh  $user@$remote_ip "cd /opt/fireeye/fso/snapshot && ../bin/fso snapshot save --include-encrypted $snapshot_file_name"
-  if [ "$3" != "" ]; then
-    snapshot_local_path=$3
+include_encrypted=""
+stream=""
+compress=""
+store=""
+for arg in "$@"; do
+  case $arg in
+    --include-encrypted) include_encrypted="--include-encrypted";;
+    --stream) stream="--stream";;
+    --compress) stream="--stream"; compress="--compress";;
+    --store) store="--store";;
+    *) snapshot_local_path=$arg;;
+  esac
+done
+
+if [ "$store" != "" ]; then
+  # the snapshot goes to a temp dir and then into the local snapshot store, where it only takes the space
+  # of the chunks no other stored snapshot has, gzip would hide the shared chunks so --compress is ignored
+  snapshot_local_path=$(mktemp -d)
+  trap 'rm -rf "$snapshot_local_path"' EXIT
+  compress=""
+fi
+
+if [ "$stream" != "" ]; then
+  # fso snapshot save writes straight into the ssh channel (fd 3), its own messages go to stderr,
+  # nothing is stored on the FSO Machine and the local file only appears when the save succeeded
+  local_file=$snapshot_local_path
+  if [ -d $snapshot_local_path ]; then
+    local_file=$snapshot_local_path/$snapshot_file_name
+  fi
+  remote_command="cd /opt/fireeye/fso && bin/fso snapshot save $include_encrypted /dev/fd/3 3>&1 1>&2"
+  if [ "$compress" != "" ]; then
+    local_file=$local_file.gz
+    remote_command="bash -c 'set -o pipefail; cd /opt/fireeye/fso && { bin/fso snapshot save $include_encrypted /dev/fd/3 3>&1 1>&2; } | gzip -1'"
+  fi
+  python3 $iso_plugins_automation/snapshot/snapshot_stream.py save $user $local_file "$remote_command"
+  stream_status=$?
+  if [ $stream_status -eq 0 ] && [ "$store" = "" ]; then
+    echo "snapshot saved to $local_file"
+    exit 0
   fi
-else
-  ssh  $user@$remote_ip "cd /opt/fireeye/fso/snapshot && ../bin/fso snapshot save $snapshot_file_name"
-  if [ "$2" != "" ]; then
-    snapshot_local_path=$2
+  if [ $stream_status -eq 75 ]; then
+    # 75: this fso cannot write its snapshot into a pipe (it seeks in the file), the snapshot is then saved
+    # on the FSO Machine and copied like without --stream
+    echo "fso cannot stream the snapshot, saving on the FSO Machine and copying the file instead"
+    stream=""
+  elif [ $stream_status -ne 0 ]; then
+    echo "streamed save failed (exit $stream_status)"
+    exit $stream_status
   fi
 fi
 
-user="root"
-rsync $user@$remote_ip:/opt/fireeye/fso/snapshot/$snapshot_file_name $snapshot_local_path
\ No newline at end of file
+if [ "$stream" = "" ]; then
+  remote_ssh $user "cd /opt/fireeye/fso/snapshot && ../bin/fso snapshot save $include_encrypted $snapshot_file_name"
+
+  user="root"
+  remote_rsync $user $user@$remote_ip:/opt/fireeye/fso/snapshot/$snapshot_file_name $snapshot_local_path || exit 1
+  if [ "$compress" != "" ]; then
+    local_file=$snapshot_local_path
+    if [ -d $snapshot_local_path ]; then
+      local_file=$snapshot_local_path/$snapshot_file_name
+    fi
+    gzip -1 -f $local_file || exit 1
+    echo "snapshot saved to $local_file.gz"
+  fi
+fi
+
+if [ "$store" != "" ]; then
+  python3 $iso_plugins_automation/snapshot/snapshot_store.py put --remove $snapshot_local_path/$snapshot_file_name || exit 1
+  echo "snapshot saved to the snapshot store as $snapshot_file_name, load it with load_snapshot $snapshot_file_name"
+fi
@@ -0,0 +1,287 @@
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import zlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from toolkit.state import atomic_file, state_path, write_atomic  # noqa: E402
+
+DEFAULT_STORE_DIR = state_path("snapshot_store")
+STORE_VERSION = 1
+BLOCK_SIZE = 4 * 1024 * 1024
+WORKERS = min(8, os.cpu_count() or 1)
+
+# content-defined chunking, a cut goes after every position whose WINDOW bytes pass two tests:
+# (1) the byte-wise sum of the window (bytes mapped through a fixed random permutation) is 0 mod 256,
+#     computed for a whole block at once with shift-adds on one big int so it runs at C speed,
+# (2) crc32 of the window has its low bits zero, only checked for the 1/256 positions passing (1).
+# Both only look at the window, so an insert or delete in a snapshot moves the cuts around it and
+# every chunk after the next cut is the same as before.
+WINDOW = 32
+PERMUTATION = bytes(random.Random(20230130).sample(range(256), 256))
+MIN_SIZE = 16 * 1024
+AVG_SIZE = 64 * 1024
+MAX_SIZE = 256 * 1024
+
+
+def window_candidates(data):
+    # end positions i (i >= WINDOW - 1) of windows whose permuted byte sum is 0 mod 256, carries between
+    # the byte lanes of the big int only reach a few lanes so the test stays local to the window
+    value = int.from_bytes(data.translate(PERMUTATION), 'little')
+    width = 1
+    while width < WINDOW:
+        value += value << (8 * width)
+        width *= 2
+    sums = value.to_bytes(len(data) + WINDOW + 1, 'little')[:len(data)]
+    candidates = []
+    position = sums.find(0, WINDOW - 1)
+    while position != -1:
+        candidates.append(position)
+        position = sums.find(0, position + 1)
+    return candidates
+
+
+def iter_chunks(inputf, min_size=MIN_SIZE, avg_size=AVG_SIZE, max_size=MAX_SIZE):
+    crc_mask = max(avg_size // 256, 1) - 1
+    pending = b""
+    while True:
+        block = inputf.read(BLOCK_SIZE)
+        data = pending + block
+        start = 0
+        for position in window_candidates(data):
+            end = position + 1
+            while end - start > max_size:
+                yield data[start:start + max_size]
+                start += max_size
+            if end - start >= min_size and zlib.crc32(data[position - WINDOW + 1:end]) & crc_mask == 0:
+                yield data[start:end]
+                start = end
+        while len(data) - start > max_size:
+            yield data[start:start + max_size]
+            start += max_size
+        pending = data[start:]
+        if not block:
+            if pending:
+                yield pending
+            return
+
+
+class SnapshotStore:
+    # chunks/<2 hex>/<sha256 hex>: one chunk, b"z" + zlib data or b"r" + raw data when zlib does not help
+    # recipes/<name>: the 32 byte sha256 digests of the snapshot's chunks in order
+    # index.json: size, sha256 and chunk counts of every snapshot
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, level=6):
+        self.store_dir = store_dir
+        self.level = level
+        self.chunk_dir = os.path.join(store_dir, "chunks")
+        self.recipe_dir = os.path.join(store_dir, "recipes")
+        self.index_file = os.path.join(store_dir, "index.json")
+
+    @contextlib.contextmanager
+    def locked(self):
+        os.makedirs(self.recipe_dir, exist_ok=True)
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        with open(os.path.join(self.store_dir, ".lock"), "w") as lockf:
+            fcntl.flock(lockf, fcntl.LOCK_EX)
+            yield
+
+    def load_index(self):
+        try:
+            with open(self.index_file) as indexf:
+                return json.load(indexf)
+        except FileNotFoundError:
+            return {"version": STORE_VERSION, "snapshots": {}}
+
+    def save_index(self, index):
+        write_atomic(self.index_file, json.dumps(index, indent=2, sort_keys=True).encode())
+
+    def chunk_path(self, digest):
+        hex_digest = digest.hex()
+        return os.path.join(self.chunk_dir, hex_digest[:2], hex_digest)
+
+    def store_chunk(self, chunk):
+        # returns (digest, stored bytes), stored bytes is 0 when the chunk was already in the store
+        digest = hashlib.sha256(chunk).digest()
+        path = self.chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        compressed = zlib.compress(chunk, self.level)
+        content = b"z" + compressed if len(compressed) < len(chunk) else b"r" + chunk
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, content)
+        return digest, len(content)
+
+    def read_chunk(self, digest):
+        with open(self.chunk_path(digest), 'rb') as chunkf:
+            content = chunkf.read()
+        return zlib.decompress(content[1:]) if content[:1] == b"z" else content[1:]
+
+    def put(self, snapshot_file, name=None):
+        name = name or os.path.basename(snapshot_file)
+        if not name or "/" in name or name.startswith("."):
+            raise ValueError("invalid snapshot name %r" % name)
+        with self.locked():
+            digests = []
+            size = 0
+            new_chunks = 0
+            new_bytes = 0
+            file_digest = hashlib.sha256()
+            # hashing and compression run in threads (both release the GIL), at most 2 * WORKERS chunks in flight
+            with open(snapshot_file, 'rb') as inputf, \
+                    concurrent.futures.ThreadPoolExecutor(WORKERS) as executor:
+                in_flight = collections.deque()
+                for chunk in iter_chunks(inputf):
+                    size += len(chunk)
+                    file_digest.update(chunk)
+                    in_flight.append(executor.submit(self.store_chunk, chunk))
+                    while len(in_flight) > 2 * WORKERS or (in_flight and in_flight[0].done()):
+                        digest, stored = in_flight.popleft().result()
+                        digests.append(digest)
+                        new_chunks += 1 if stored else 0
+                        new_bytes += stored
+                for future in in_flight:
+                    digest, stored = future.result()
+                    digests.append(digest)
+                    new_chunks += 1 if stored else 0
+                    new_bytes += stored
+            write_atomic(os.path.join(self.recipe_dir, name), b"".join(digests))
+            index = self.load_index()
+            index["snapshots"][name] = {"size": size, "sha256": file_digest.hexdigest(), "chunks": len(digests),
+                                        "new_chunks": new_chunks, "new_bytes": new_bytes,
+                                        "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            self.save_index(index)
+            return index["snapshots"][name]
+
+    def recipe(self, name):
+        with open(os.path.join(self.recipe_dir, name), 'rb') as recipef:
+            data = recipef.read()
+        return [data[i:i + 32] for i in range(0, len(data), 32)]
+
+    def get(self, name, outputf):
+        # chunks are read and decompressed ahead in threads and written in order, the sha256 of the
+        # reassembled snapshot is checked against the one recorded by put
+        entry = self.load_index()["snapshots"].get(name)
+        if entry is None:
+            raise KeyError(name)
+        file_digest = hashlib.sha256()
+        with concurrent.futures.ThreadPoolExecutor(WORKERS) as executor:
+            in_flight = collections.deque()
+            for digest in self.recipe(name):
+                in_flight.append(executor.submit(self.read_chunk, digest))
+                if len(in_flight) > 2 * WORKERS:
+                    chunk = in_flight.popleft().result()
+                    file_digest.update(chunk)
+                    outputf.write(chunk)
+            for future in in_flight:
+                chunk = future.result()
+                file_digest.update(chunk)
+                outputf.write(chunk)
+        if file_digest.hexdigest() != entry["sha256"]:
+            raise ValueError("snapshot %s is corrupt, sha256 does not match" % name)
+        return entry
+
+    def get_file(self, name, output_file):
+        with atomic_file(output_file, "wb") as outputf:
+            return self.get(name, outputf)
+
+    def delete(self, name):
+        with self.locked():
+            index = self.load_index()
+            if index["snapshots"].pop(name, None) is None:
+                raise KeyError(name)
+            os.remove(os.path.join(self.recipe_dir, name))
+            self.save_index(index)
+            return self.gc(index)
+
+    def gc(self, index):
+        # chunks referenced by no recipe are removed, returns the bytes freed
+        referenced = set()
+        for name in index["snapshots"]:
+            referenced.update(self.recipe(name))
+        freed = 0
+        for prefix in os.listdir(self.chunk_dir):
+            for hex_digest in os.listdir(os.path.join(self.chunk_dir, prefix)):
+                if hex_digest.startswith(".") or bytes.fromhex(hex_digest) in referenced:
+                    continue
+                path = os.path.join(self.chunk_dir, prefix, hex_digest)
+                freed += os.path.getsize(path)
+                os.remove(path)
+        return freed
+
+    def stored_bytes(self):
+        total = 0
+        if os.path.isdir(self.chunk_dir):
+            for prefix in os.listdir(self.chunk_dir):
+                for hex_digest in os.listdir(os.path.join(self.chunk_dir, prefix)):
+                    total += os.path.getsize(os.path.join(self.chunk_dir, prefix, hex_digest))
+        return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="deduplicating store of FSO snapshots")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--level", type=int, default=6, help="zlib level of new chunks")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    put_parser = subparsers.add_parser("put", help="add snapshot files, named after the file")
+    put_parser.add_argument("snapshot_files", nargs="+")
+    put_parser.add_argument("--name", help="store a single snapshot file under this name")
+    put_parser.add_argument("--remove", action="store_true", help="remove the snapshot files once stored")
+    get_parser = subparsers.add_parser("get", help="reassemble a snapshot to output_file")
+    get_parser.add_argument("name")
+    get_parser.add_argument("output_file")
+    has_parser = subparsers.add_parser("has", help="exit 0 when the store has the snapshot")
+    has_parser.add_argument("name")
+    delete_parser = subparsers.add_parser("delete", help="remove snapshots and their unused chunks")
+    delete_parser.add_argument("names", nargs="+")
+    subparsers.add_parser("list", help="snapshots and store size")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.store, args.level)
+    if args.action == "put":
+        if args.name and len(args.snapshot_files) > 1:
+            parser.error("--name needs a single snapshot file")
+        for snapshot_file in args.snapshot_files:
+            start = time.perf_counter()
+            entry = store.put(snapshot_file, args.name)
+            elapsed = time.perf_counter() - start
+            print("%s: %.1f MB, %d chunks, %d new (%.1f MB stored), %.1f MB/s" % (
+                args.name or os.path.basename(snapshot_file), entry["size"] / 2 ** 20, entry["chunks"],
+                entry["new_chunks"], entry["new_bytes"] / 2 ** 20, entry["size"] / 2 ** 20 / max(elapsed, 1e-6)))
+            if args.remove:
+                os.remove(snapshot_file)
+    elif args.action == "get":
+        start = time.perf_counter()
+        try:
+            entry = store.get_file(args.name, args.output_file)
+        except KeyError:
+            print("no snapshot %s in %s" % (args.name, args.store))
+            sys.exit(1)
+        elapsed = time.perf_counter() - start
+        print("%s: %.1f MB reassembled in %.2fs, %.1f MB/s" % (args.name, entry["size"] / 2 ** 20, elapsed,
+                                                              entry["size"] / 2 ** 20 / max(elapsed, 1e-6)))
+    elif args.action == "has":
+        sys.exit(0 if args.name in store.load_index()["snapshots"] else 1)
+    elif args.action == "delete":
+        for name in args.names:
+            try:
+                print("%s deleted, %.1f MB freed" % (name, store.delete(name) / 2 ** 20))
+            except KeyError:
+                print("no snapshot %s in %s" % (name, args.store))
+    else:
+        snapshots = store.load_index()["snapshots"]
+        for name, entry in sorted(snapshots.items()):
+            print("%-40s %10.1f MB %8d chunks  %s" % (name, entry["size"] / 2 ** 20, entry["chunks"],
+                                                     entry["created"]))
+        logical = sum(entry["size"] for entry in snapshots.values())
+        stored = store.stored_bytes()
+        print("%d snapshots, %.1f MB of snapshots in %.1f MB of chunks (%.1fx)" % (
+            len(snapshots), logical / 2 ** 20, stored / 2 ** 20, logical / max(stored, 1)))
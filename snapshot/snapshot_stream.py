@@ -0,0 +1,135 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+TOOLKIT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(TOOLKIT_DIR)
+
+from toolkit.remote import remote_ssh  # noqa: E402
+
+CHUNK_SIZE = 1024 * 1024
+REPORT_INTERVAL = 2
+# an fso that seeks in its snapshot file fails on the ssh channel with one of these, only then is the stream
+# reported unsupported (exit STREAM_UNSUPPORTED) and the scripts go through a file on the FSO Machine instead
+SEEK_ERROR = re.compile(rb"illegal seek|cannot seek|not seekable|UnsupportedOperation: (seek|tell)|ESPIPE", re.I)
+STREAM_UNSUPPORTED = 75
+
+
+class Throughput:
+    # bytes copied so far, a progress line on stderr every REPORT_INTERVAL seconds
+    def __init__(self, label):
+        self.label = label
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self.reported = self.start
+
+    def add(self, size):
+        self.bytes += size
+        now = time.perf_counter()
+        if now - self.reported >= REPORT_INTERVAL:
+            self.reported = now
+            sys.stderr.write("\r%s %.1f MB, %.1f MB/s" % (self.label, self.bytes / 2 ** 20, self.rate()))
+            sys.stderr.flush()
+
+    def rate(self):
+        return self.bytes / 2 ** 20 / max(time.perf_counter() - self.start, 1e-6)
+
+    def summary(self):
+        return "%s %.1f MB in %.1fs, %.1f MB/s" % (self.label, self.bytes / 2 ** 20,
+                                                 time.perf_counter() - self.start, self.rate())
+
+
+class StderrWatch:
+    # remote stderr is passed on line by line and checked for SEEK_ERROR
+    def __init__(self, process):
+        self.unsupported = False
+        self.thread = threading.Thread(target=self.watch, args=(process.stderr,), daemon=True)
+        self.thread.start()
+
+    def watch(self, stderr):
+        for line in iter(stderr.readline, b""):
+            sys.stderr.buffer.write(line)
+            sys.stderr.flush()
+            if SEEK_ERROR.search(line):
+                self.unsupported = True
+
+    def exit_code(self, process_exit_code):
+        self.thread.join()
+        if process_exit_code == 0:
+            return 0
+        if self.unsupported:
+            return STREAM_UNSUPPORTED
+        # any other failure is the remote command's own, it never reads as STREAM_UNSUPPORTED
+        return 1 if process_exit_code == STREAM_UNSUPPORTED else process_exit_code
+
+
+def save(user, remote_command, local_file):
+    # stdout of the remote command goes to a temp file next to local_file, renamed when the remote side exits 0
+    local_dir = os.path.dirname(os.path.abspath(local_file))
+    fd, tmp_file = tempfile.mkstemp(dir=local_dir, prefix=".snapshot.", suffix=".tmp")
+    throughput = Throughput("received")
+    try:
+        with os.fdopen(fd, 'wb') as outputf:
+            process = remote_ssh(user, remote_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            stderr_watch = StderrWatch(process)
+            for chunk in iter(lambda: process.stdout.read(CHUNK_SIZE), b""):
+                outputf.write(chunk)
+                throughput.add(len(chunk))
+            exit_code = stderr_watch.exit_code(process.wait())
+        if exit_code != 0:
+            os.remove(tmp_file)
+            return exit_code
+        os.replace(tmp_file, local_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    sys.stderr.write("\r" + throughput.summary() + "\n")
+    return 0
+
+
+def load(user, remote_command, local_file):
+    throughput = Throughput("sent")
+    # the local file is opened before ssh is started, a missing file never reaches the FSO Machine
+    try:
+        inputf = open(local_file, 'rb')
+    except OSError as error:
+        sys.stderr.write("%s\n" % error)
+        return 1
+    with inputf:
+        process = remote_ssh(user, remote_command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        stderr_watch = StderrWatch(process)
+        try:
+            for chunk in iter(lambda: inputf.read(CHUNK_SIZE), b""):
+                process.stdin.write(chunk)
+                throughput.add(len(chunk))
+            process.stdin.close()
+        except BrokenPipeError:
+            # the remote side stopped reading, its exit code tells why
+            pass
+    exit_code = stderr_watch.exit_code(process.wait())
+    if exit_code == 0:
+        sys.stderr.write("\r" + throughput.summary() + "\n")
+    return exit_code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="stream a snapshot between local disk and a remote command")
+    parser.add_argument("action", choices=["save", "load"],
+                        help="save: remote stdout to local_file, load: local_file to remote stdin")
+    parser.add_argument("user")
+    parser.add_argument("local_file")
+    parser.add_argument("remote_command")
+    args = parser.parse_args()
+
+    try:
+        if args.action == "save":
+            sys.exit(save(args.user, args.remote_command, args.local_file))
+        sys.exit(load(args.user, args.remote_command, args.local_file))
+    except KeyboardInterrupt:
+        sys.exit(130)
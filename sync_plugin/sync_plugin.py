@@ -0,0 +1,114 @@
+import argparse
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+
+TOOLKIT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(TOOLKIT_DIR)
+
+from toolkit.remote import remote  # noqa: E402
+from toolkit.state import state_path, write_atomic  # noqa: E402
+
+MANIFEST_CACHE_DIR = state_path("manifests")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as inputf:
+        for chunk in iter(lambda: inputf.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(plugin_dir):
+    # relative path -> sha256 of every file, files whose size and mtime did not change since the
+    # last run are not read again, their hash comes from the local cache
+    cache_file = os.path.join(MANIFEST_CACHE_DIR, hashlib.sha1(plugin_dir.encode()).hexdigest() + ".json")
+    try:
+        with open(cache_file) as cachef:
+            cache = json.load(cachef)
+    except (OSError, ValueError):
+        cache = {}
+    manifest = {}
+    stats = {}
+    for root, dirs, files in os.walk(plugin_dir):
+        dirs.sort()
+        for name in files:
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, plugin_dir)
+            stat = os.stat(path)
+            cached = cache.get(rel_path)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                sha = cached[2]
+            else:
+                sha = file_sha256(path)
+            manifest[rel_path] = sha
+            stats[rel_path] = [stat.st_size, stat.st_mtime_ns, sha]
+    if stats != cache:
+        write_atomic(cache_file, json.dumps(stats))
+    return manifest
+
+
+def manifest_digest(manifest):
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()
+
+
+def sync(user, plugin_dir, remote_source_dir, full=False):
+    plugin_dir = os.path.abspath(plugin_dir)
+    plugin_name = os.path.basename(plugin_dir)
+    remote_dir = remote_source_dir.rstrip("/") + "/" + plugin_name
+    # the remote manifest lives next to the plugin sources, not inside them, so package_plugin never sees it
+    remote_manifest = remote_source_dir.rstrip("/") + "/.manifest/" + plugin_name
+    manifest = build_manifest(plugin_dir)
+    digest = manifest_digest(manifest)
+
+    # one round trip: "UPTODATE" when the remote manifest has the same digest, the remote manifest otherwise,
+    # nothing when the plugin dir is gone (fso reset)
+    check = ("if [ ! -d {2} ]; then true; elif [ \"$(head -1 {0} 2>/dev/null)\" = {1} ]; then echo UPTODATE; "
+             "else tail -n +2 {0} 2>/dev/null || true; fi")
+    output = remote('remote_ssh "$1" "$2"', user,
+                    check.format(shlex.quote(remote_manifest), digest, shlex.quote(remote_dir))).stdout
+    if output.strip() == b"UPTODATE" and not full:
+        print("%s is up to date on the FSO Machine, %d files" % (plugin_name, len(manifest)))
+        return
+    try:
+        remote_files = {} if full else json.loads(output or b"{}")
+    except ValueError:
+        remote_files = {}
+
+    changed = sorted(rel_path for rel_path, sha in manifest.items() if remote_files.get(rel_path) != sha)
+    deleted = sorted(rel_path for rel_path in remote_files if rel_path not in manifest)
+    if changed:
+        with tempfile.NamedTemporaryFile("w", prefix="sync_plugin.", suffix=".files") as listf:
+            listf.write("\n".join(changed) + "\n")
+            listf.flush()
+            remote('remote_rsync "$1" -t --files-from="$2" "$3/" "$1@$remote_ip:$4/"',
+                   user, listf.name, plugin_dir, remote_dir)
+    # deletes and the new manifest go in one more round trip, the manifest is written last so an
+    # interrupted sync is found out of date next time
+    commit = "mkdir -p {0} && ".format(shlex.quote(os.path.dirname(remote_manifest)))
+    if deleted:
+        commit += "cd {0} && rm -f -- {1} && ".format(shlex.quote(remote_dir), " ".join(map(shlex.quote, deleted)))
+    commit += "cat > {0}.tmp && mv {0}.tmp {0}".format(shlex.quote(remote_manifest))
+    remote('remote_ssh "$1" "$2"', user, commit, input=(digest + "\n" + json.dumps(manifest)).encode())
+    print("%s synced to the FSO Machine: %d of %d files sent, %d deleted" % (
+        plugin_name, len(changed), len(manifest), len(deleted)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="send only the changed files of a plugin to the FSO Machine")
+    parser.add_argument("user", help="ssh user on the FSO Machine")
+    parser.add_argument("plugin_dir", help="local plugin source dir, eg. <iso_plugin_path>/microsoft/teams")
+    parser.add_argument("remote_source_dir", help="plugin_dir is synced to <remote_source_dir>/<plugin dir name>")
+    parser.add_argument("--full", action="store_true", help="ignore the remote manifest and send every file")
+    args = parser.parse_args()
+
+    try:
+        sync(args.user, args.plugin_dir, args.remote_source_dir, args.full)
+    except subprocess.CalledProcessError as e:
+        print("sync of %s failed: %s" % (args.plugin_dir, e))
+        sys.exit(1)
@@ -0,0 +1,20 @@
+import subprocess
+
+# runs <function> of config/remote.sh, so the python tools use the same ssh session and remote_ip as the scripts
+REMOTE_SH = '. "$iso_plugins_automation/config/config.sh"; . "$iso_plugins_automation/config/remote.sh"; '
+
+
+def remote(function, *args, input=None):
+    # without input the remote command gets no stdin, ssh must not read the caller's terminal or pipe
+    return subprocess.run(["sh", "-c", REMOTE_SH + function, "sh"] + list(args), input=input,
+                          stdin=subprocess.DEVNULL if input is None else None, stdout=subprocess.PIPE, check=True)
+
+
+def remote_ssh(user, command, **kwargs):
+    # command runs on the FSO Machine as user, the caller streams through the returned process and waits on it
+    return subprocess.Popen(["sh", "-c", REMOTE_SH + 'remote_ssh "$1" "$2"', "sh", user, command], **kwargs)
+
+
+def remote_python(user, args, **kwargs):
+    # the python source written to stdin runs with the FSO python (fso_python of config/remote.sh)
+    return subprocess.Popen(["sh", "-c", REMOTE_SH + 'remote_python "$1" "$2"', "sh", user, args], **kwargs)
@@ -0,0 +1,34 @@
+import contextlib
+import os
+import tempfile
+
+# per-user state of the toolkit: build cache, sync manifests, snapshot store, fetched logs and their index
+STATE_DIR = os.environ.get("ISO_AUTOMATION_STATE_DIR",
+                           os.path.join(os.path.expanduser("~"), ".iso_plugins_automation"))
+
+
+def state_path(*names):
+    return os.path.join(STATE_DIR, *names)
+
+
+@contextlib.contextmanager
+def atomic_file(path, mode="w"):
+    # written next to path and renamed over it, a failed or interrupted write never leaves a partial file
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as outputf:
+            yield outputf
+        # mkstemp creates the file 0600
+        os.chmod(tmp_file, 0o644)
+        os.replace(tmp_file, path)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+def write_atomic(path, content):
+    with atomic_file(path, "wb" if isinstance(content, bytes) else "w") as outputf:
+        outputf.write(content)
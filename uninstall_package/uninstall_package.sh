@@ -1,15 +1,39 @@
 source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
 user="ixoperator"
 plugin_name=$1
 
-package_names=$(ssh $user@$remote_ip '/opt/fireeye/fso/bin/fso package list' | grep $plugin_name | tr ">>" "\n")
+if [ "$plugin_name" = "" ]; then
+  echo "usage: uninstall_package <package_name>"
+  exit 1
+fi
 
-oldstr=">>"
-newstr=""
+# list, match and uninstall run in one remote shell, uninstall output goes to stderr and
+# one "<status> <package_name> <exit code>" line per package to stdout; this script is the remote shell's
+# stdin, so fso reads /dev/null instead of the rest of it
+package_status=$(remote_ssh $user "sh -s -- '$plugin_name'" <<'REMOTE'
+cd /opt/fireeye/fso
+package_names=$(bin/fso package list </dev/null | grep -- "$1" | tr ">" "\n")
 for package_name in $package_names
 do
-  package_name=$(echo $package_name | sed "s/$oldstr/$newstr/")
-  ssh $user@$remote_ip "/opt/fireeye/fso/bin/fso package uninstall $package_name"
+  bin/fso package uninstall $package_name </dev/null 1>&2
+  exit_code=$?
+  if [ $exit_code -eq 0 ]; then
+    echo "UNINSTALLED $package_name $exit_code"
+  else
+    echo "FAILED $package_name $exit_code"
+  fi
 done
+REMOTE
+)
 
+if [ "$package_status" = "" ]; then
+  echo "no installed package matches $plugin_name"
+  exit 1
+fi
 
+echo "$package_status" | awk '{printf "%-12s %-50s %s\n", $1, $2, $3; count[$1]++}
+  END {printf "%d uninstalled, %d failed\n", count["UNINSTALLED"], count["FAILED"]}'
+if echo "$package_status" | grep -q "^FAILED"; then
+  exit 1
+fi
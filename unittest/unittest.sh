@@ -1,11 +1,13 @@
 source $iso_plugins_automation/config/config.sh
+source $iso_plugins_automation/config/remote.sh
 plugin_name=$1           # bmc/remedy
 plugin_name_last="${plugin_name##*/}"  #remedy
 
-rsync -r $iso_plugin_path$plugin_name $user@$remote_ip:/opt/fireeye/fso/source/
+# only files changed since the last sync are sent, see sync_plugin/sync_plugin.py
+python3 $iso_plugins_automation/sync_plugin/sync_plugin.py $user $iso_plugin_path$plugin_name /opt/fireeye/fso/source || exit 1
 
 
-unit_test_file=$(ssh $user@$remote_ip "cd /opt/fireeye/fso && ls source/$plugin_name_last/unit_test | grep unit_test.py")
+unit_test_file=$(remote_ssh $user "cd /opt/fireeye/fso && ls source/$plugin_name_last/unit_test | grep unit_test.py")
 echo $unit_test_file
 # 2nd arg test_name
 if [ "$unit_test_file" = "" ]
@@ -13,8 +15,8 @@ then
     echo "unit_test_file not found"
 else
     if [ $2 ];then
-      ssh $user@$remote_ip "cd /opt/fireeye/fso && source config/iso_package_dev_env && pytest -s source/$plugin_name_last/unit_test/$unit_test_file::$2"
+      remote_ssh $user "cd /opt/fireeye/fso && source config/iso_package_dev_env && pytest -s source/$plugin_name_last/unit_test/$unit_test_file::$2"
     else
-      ssh $user@$remote_ip "cd /opt/fireeye/fso && source config/iso_package_dev_env && pytest -s source/$plugin_name_last/unit_test/$unit_test_file"
+      remote_ssh $user "cd /opt/fireeye/fso && source config/iso_package_dev_env && pytest -s source/$plugin_name_last/unit_test/$unit_test_file"
     fi
 fi  